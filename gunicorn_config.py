@@ -42,3 +42,22 @@ preload_app = False
 # keyfile = "/path/to/keyfile"
 # certfile = "/path/to/certfile"
 
+
+
+# Warm-up: compile templates and build the chatbot context before the worker takes requests
+# (also after max_requests recycling). Shared page cache: python manage.py warm_cache.
+# Then listen for cache invalidations from the other nodes/workers (website/invalidation_bus.py)
+# and start the inquiry country lookup thread (website/geolocation.py). nginx purges run in the
+# background from here on (website/nginx_cache.py).
+def post_worker_init(worker):
+    from website.geolocation import start_worker
+    from website.invalidation_bus import start_listener
+    from website.nginx_cache import start_background_purges
+    from website.warmup import warm_worker
+    try:
+        warm_worker()
+    except Exception:
+        worker.log.exception("Worker warm-up failed")
+    start_background_purges()
+    start_listener()
+    start_worker()
@@ -6,6 +6,7 @@ Generated for Techlynx Pro - Professional IT Services Website
 
 from pathlib import Path
 import os
+import socket
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -67,12 +68,17 @@ MIDDLEWARE = [
     'website.middleware.SecurityHeadersMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Compressed static files when Django serves /static/
     'django.middleware.gzip.GZipMiddleware',  # Compress HTML from views (nginx /static/ bypasses this)
+    'website.middleware.StreamingCompressionMiddleware',  # Streamed pages: flushed per chunk
+    # Outside sessions/CSRF so it sees the cookies they set (such responses keep no public policy).
+    'website.middleware.CachePolicyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so it sees view exceptions first: last-known-good pages while the DB is unavailable.
+    'website.middleware.DatabaseUnavailableMiddleware',
 ]
 
 ROOT_URLCONF = 'techlynx_project.urls'
@@ -113,6 +119,80 @@ DATABASES = {
 }
 
 
+# Cache
+# One memory-mapped file shared by every gunicorn worker on the host (website/cache_backends.py):
+# entries and invalidations are seen by all workers and survive worker recycling/restarts
+# (LocMem is per-process: an admin edit handled by one worker would leave the others stale).
+CACHES = {
+    'default': {
+        'BACKEND': 'website.cache_backends.MmapCache',
+        'LOCATION': str(Path(config('CACHE_DIR', default=str(BASE_DIR / 'private' / 'cache'))) / 'shared.mmap'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SIZE': config('CACHE_SIZE_MB', default=128, cast=int) * 1024 * 1024,
+            'SLOTS': 16384,
+        },
+    }
+}
+
+# Full-page cache for public views (website/page_cache.py). Invalidated on content save/delete,
+# so the timeout is only a safety net. Off by default in DEBUG so template edits show immediately.
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=not DEBUG, cast=bool)
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# Seconds an expired/invalidated page may still be served while it is re-rendered in the
+# background (per view: @cache_public_page(stale=...)). 0 = render synchronously.
+PAGE_CACHE_STALE_TIMEOUT = config('PAGE_CACHE_STALE_TIMEOUT', default=0, cast=int)
+# On a miss another worker is already rendering, wait this long for its result before rendering too.
+PAGE_CACHE_FILL_WAIT = config('PAGE_CACHE_FILL_WAIT', default=5.0, cast=float)
+# Render cache for {% fragment %} blocks (website/templatetags/fragment_cache.py), keyed by the
+# versions of the tables they display. Off by default in DEBUG so template edits show immediately.
+FRAGMENT_CACHE_ENABLED = config('FRAGMENT_CACHE_ENABLED', default=not DEBUG, cast=bool)
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# Views using stream_page() (website/streaming.py, the home page) send the <head> before rendering
+# the body. Off: they render in one piece like render().
+PAGE_STREAMING_ENABLED = config('PAGE_STREAMING_ENABLED', default=True, cast=bool)
+# Offline IP -> country ranges (website/geoip.py), built by: python manage.py import_geoip <csv>
+GEOIP_DB_PATH = config('GEOIP_DB_PATH', default=str(BASE_DIR / 'private' / 'geoip' / 'ip-country.bin'))
+# Geolocation API results kept in the shared cache (per IP); failed lookups for a shorter time.
+GEOIP_CACHE_TIMEOUT = config('GEOIP_CACHE_TIMEOUT', default=60 * 60 * 24 * 30, cast=int)
+GEOIP_NEGATIVE_CACHE_TIMEOUT = config('GEOIP_NEGATIVE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+# Geolocation APIs (website/geo_providers.py): whole-lookup deadline, and how long to wait for
+# one provider before also asking the next.
+GEOIP_LOOKUP_DEADLINE = config('GEOIP_LOOKUP_DEADLINE', default=5.0, cast=float)
+GEOIP_HEDGE_DELAY = config('GEOIP_HEDGE_DELAY', default=0.5, cast=float)
+# Lock files shared by all workers (single-flight cache fills, website/locks.py).
+CACHE_LOCK_DIR = config('CACHE_LOCK_DIR', default=str(BASE_DIR / 'private' / 'locks'))
+
+# Read-only fallback (website/last_good.py, DatabaseUnavailableMiddleware): every cached page is
+# also kept here as its last-known-good copy, served with Retry-After if the database fails.
+LAST_GOOD_DIR = config('LAST_GOOD_DIR', default=str(BASE_DIR / 'private' / 'last_good'))
+# Copies kept at most (least recently written removed first).
+LAST_GOOD_MAX_FILES = config('LAST_GOOD_MAX_FILES', default=1000, cast=int)
+DB_UNAVAILABLE_RETRY_AFTER = config('DB_UNAVAILABLE_RETRY_AFTER', default=30, cast=int)
+
+# nginx micro-cache (proxy_cache in nginx/techlynxpro.conf, website/nginx_cache.py): seconds nginx
+# may keep a cached page (X-Accel-Expires; 0 = never) and the loopback refresh server used to
+# purge pages on content change (e.g. http://127.0.0.1:8081). Empty = no purge.
+NGINX_CACHE_TIMEOUT = config('NGINX_CACHE_TIMEOUT', default=60, cast=int)
+NGINX_CACHE_PURGE_URL = config('NGINX_CACHE_PURGE_URL', default='')
+
+# Cache invalidation broadcast between app nodes (website/invalidation_bus.py). Empty = outbox table
+# in the database; or redis://host:6379/0. NODE_NAME must differ per node (default: hostname).
+# Off (poll interval 0) unless a bus URL or a node name is set: a single node needs no broadcast.
+INVALIDATION_BUS_URL = config('INVALIDATION_BUS_URL', default='')
+NODE_NAME = config('NODE_NAME', default='')
+INVALIDATION_BUS_POLL_INTERVAL = config(
+    'INVALIDATION_BUS_POLL_INTERVAL', default=1.0 if INVALIDATION_BUS_URL or NODE_NAME else 0.0, cast=float,
+)
+NODE_NAME = NODE_NAME or socket.gethostname()
+
+# Static pre-render for nginx (manage.py publish_pages). When set, admin edits re-render the
+# affected pages into this directory on save. Empty = publishing disabled.
+PUBLISH_ROOT = config('PUBLISH_ROOT', default='')
+# Host the pages are rendered for (canonical / Open Graph URLs are built from it).
+PUBLISH_HOST = config('PUBLISH_HOST', default='techlynxpro.com')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
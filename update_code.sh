@@ -42,6 +42,9 @@ python manage.py migrate --noinput
 echo -e "${YELLOW}[4] Collecting static files...${NC}"
 python manage.py collectstatic --noinput --clear
 
+echo -e "${YELLOW}[4b] Re-rendering published pages for nginx (PUBLISH_ROOT)...${NC}"
+python manage.py publish_pages || echo -e "${YELLOW}  (skipped — PUBLISH_ROOT not set in .env)${NC}"
+
 echo -e "${YELLOW}[5] Setting correct permissions...${NC}"
 chmod -R 755 staticfiles/ 2>/dev/null || true
 chmod -R 755 media/ 2>/dev/null || true
@@ -82,6 +85,9 @@ else
     echo -e "${RED}✗ Nginx is NOT running${NC}"
 fi
 
+echo -e "${YELLOW}[8] Warming page cache (sitemap URLs)...${NC}"
+python manage.py warm_cache || echo -e "${YELLOW}  (warm-up failed — pages render on first visit)${NC}"
+
 echo ""
 echo "========================================="
 echo -e "${GREEN}Code update completed!${NC}"
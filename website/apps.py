@@ -5,3 +5,6 @@ class WebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'website'
     verbose_name = '🏠 Home Page Content'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects cache invalidation receivers)
@@ -0,0 +1,340 @@
+"""
+Host-wide shared cache backend on a memory-mapped file.
+
+Every gunicorn worker maps the same file, so an entry computed by one worker is a memory read for
+all the others, and it outlives worker recycling (max_requests) and restarts. No server needed.
+
+    CACHES = {'default': {
+        'BACKEND': 'website.cache_backends.MmapCache',
+        'LOCATION': '/path/to/cache.mmap',
+        'OPTIONS': {'SIZE': 128 * 1024 * 1024, 'SLOTS': 16384},
+    }}
+
+Layout: a header, a fixed open-addressing slot table (md5 of the key → offset, length, expiry,
+last use) and an append-only data area. When the data area or the slot table fills up, the least
+recently used entries are evicted and the survivors are compacted to the front.
+
+Every operation runs under one exclusive lock (django.core.files.locks on the file, plus a thread
+lock), so add() and incr() are atomic across processes — usable for locks and counters.
+
+A worker killed mid-write must not leave slots pointing at overwritten bytes. set() advances the
+write offset before it publishes the slot, and a compaction, which rewrites the data in place,
+replaces the magic with _DIRTY_MAGIC until it has finished: the next operation (in any process)
+that finds the file marked dirty starts from an empty cache. An entry that still fails to
+unpickle is treated as a miss and deleted.
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.files import locks
+
+_MAGIC = b'TLXMMAP1'
+# In the magic's place while a compaction rewrites the file.
+_DIRTY_MAGIC = b'TLXDIRTY'
+# magic, slot count, data size, write offset, slots in use (live + deleted), clock
+_HEADER = struct.Struct('<8sQQQQQ')
+_HEADER_SIZE = 64
+# key digest, data offset, length, expires (0 = never), last use (clock)
+_SLOT = struct.Struct('<16sQQdQ')
+_EMPTY = b'\x00' * 16
+_DELETED = b'\xff' * 16
+
+# After an eviction the data area / slot table is at most this full, so the next ones are rare.
+_EVICT_TARGET = 0.75
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _Store:
+    """One mapped cache file; shared by every backend instance (thread) in the process."""
+
+    def __init__(self, path, size, slots):
+        self.path = path
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.slots = slots
+        self.data_start = _HEADER_SIZE + slots * _SLOT.size
+        self.data_size = size
+        total = self.data_start + size
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a+b')
+        locks.lock(self.file, locks.LOCK_EX)
+        try:
+            if os.fstat(self.file.fileno()).st_size != total:
+                self.file.truncate(total)
+            self.map = mmap.mmap(self.file.fileno(), total)
+            magic, file_slots, file_size, *_ = _HEADER.unpack_from(self.map, 0)
+            if magic != _MAGIC or file_slots != slots or file_size != size:
+                self._reset()
+        finally:
+            locks.unlock(self.file)
+
+    # Header / slot access (lock held) ------------------------------------------------------
+
+    def _header(self):
+        return list(_HEADER.unpack_from(self.map, 0))
+
+    def _write_header(self, header):
+        _HEADER.pack_into(self.map, 0, *header)
+
+    def _slot_offset(self, index):
+        return _HEADER_SIZE + index * _SLOT.size
+
+    def _read_slot(self, index):
+        return _SLOT.unpack_from(self.map, self._slot_offset(index))
+
+    def _write_slot(self, index, *fields):
+        _SLOT.pack_into(self.map, self._slot_offset(index), *fields)
+
+    def _reset(self):
+        self.map[:self.data_start] = bytes(self.data_start)
+        self._write_header([_MAGIC, self.slots, self.data_size, 0, 0, 0])
+
+    def check(self):
+        """Start over if a process died while compacting (or the header is damaged)."""
+        if self.map[:len(_MAGIC)] != _MAGIC:
+            self._reset()
+
+    def _probe(self, digest):
+        start = int.from_bytes(digest[:8], 'little') % self.slots
+        for step in range(self.slots):
+            yield (start + step) % self.slots
+
+    def _find(self, digest):
+        for index in self._probe(digest):
+            slot_digest = self._read_slot(index)[0]
+            if slot_digest == digest:
+                return index
+            if slot_digest == _EMPTY:
+                return None
+        return None
+
+    def _tick(self, header):
+        header[5] += 1
+        return header[5]
+
+    # Operations (lock held) ----------------------------------------------------------------
+
+    def get(self, digest, now):
+        index = self._find(digest)
+        if index is None:
+            return None
+        _, offset, length, expires, _ = self._read_slot(index)
+        if expires and expires <= now:
+            self._delete_slot(index)
+            return None
+        header = self._header()
+        self._write_slot(index, digest, offset, length, expires, self._tick(header))
+        self._write_header(header)
+        start = self.data_start + offset
+        return self.map[start:start + length]
+
+    def set(self, digest, data, expires):
+        index = self._find(digest)
+        if index is not None:
+            self._delete_slot(index)
+        if not self._make_room(len(data)):
+            return False
+        header = self._header()
+        offset = header[3]
+        start = self.data_start + offset
+        self.map[start:start + len(data)] = data
+        header[3] = offset + len(data)
+        for index in self._probe(digest):
+            slot_digest = self._read_slot(index)[0]
+            if slot_digest in (_EMPTY, _DELETED):
+                if slot_digest == _EMPTY:
+                    header[4] += 1
+                clock = self._tick(header)
+                # Header first: a slot must never point past the write offset.
+                self._write_header(header)
+                self._write_slot(index, digest, offset, len(data), expires, clock)
+                return True
+        self._write_header(header)
+        return True
+
+    def touch(self, digest, expires, now):
+        index = self._find(digest)
+        if index is None:
+            return False
+        _, offset, length, old_expires, last_used = self._read_slot(index)
+        if old_expires and old_expires <= now:
+            self._delete_slot(index)
+            return False
+        self._write_slot(index, digest, offset, length, expires, last_used)
+        return True
+
+    def delete(self, digest):
+        index = self._find(digest)
+        if index is None:
+            return False
+        self._delete_slot(index)
+        return True
+
+    def _delete_slot(self, index):
+        # Deleted marker, not empty: later keys of the same probe chain must stay reachable.
+        self._write_slot(index, _DELETED, 0, 0, 0.0, 0)
+
+    def _make_room(self, length):
+        header = self._header()
+        if header[3] + length <= self.data_size and header[4] < self.slots * _EVICT_TARGET:
+            return True
+        if length > self.data_size * _EVICT_TARGET:
+            return False
+        self._compact(length)
+        return True
+
+    def _compact(self, incoming):
+        """Drop expired and least recently used entries, then pack the rest to the front."""
+        now = time.time()
+        live = []
+        for index in range(self.slots):
+            digest, offset, length, expires, last_used = self._read_slot(index)
+            if digest in (_EMPTY, _DELETED) or (expires and expires <= now):
+                continue
+            start = self.data_start + offset
+            live.append((last_used, digest, self.map[start:start + length], expires))
+        live.sort(key=lambda entry: entry[0], reverse=True)
+
+        byte_budget = self.data_size * _EVICT_TARGET - incoming
+        slot_budget = int(self.slots * _EVICT_TARGET) - 1
+        kept, used = [], 0
+        for entry in live:
+            if used + len(entry[2]) > byte_budget or len(kept) >= slot_budget:
+                break
+            kept.append(entry)
+            used += len(entry[2])
+
+        header = self._header()
+        header[0] = _DIRTY_MAGIC  # until the rewrite below is complete
+        self._write_header(header)
+        self.map[_HEADER_SIZE:self.data_start] = bytes(self.data_start - _HEADER_SIZE)
+        offset = 0
+        for last_used, digest, data, expires in kept:
+            start = self.data_start + offset
+            self.map[start:start + len(data)] = data
+            for index in self._probe(digest):
+                if self._read_slot(index)[0] == _EMPTY:
+                    self._write_slot(index, digest, offset, len(data), expires, last_used)
+                    break
+            offset += len(data)
+        header[0] = _MAGIC
+        header[3] = offset
+        header[4] = len(kept)
+        self._write_header(header)
+
+    def clear(self):
+        self._reset()
+
+
+def _get_store(path, size, slots):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None or store.pid != os.getpid():
+            # Never reuse a mapping (and its thread lock) inherited across fork().
+            store = _Store(path, size, slots)
+            _stores[path] = store
+        return store
+
+
+class MmapCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = os.path.abspath(location)
+        self._size = int(options.get('SIZE', 128 * 1024 * 1024))
+        self._slots = int(options.get('SLOTS', 16384))
+
+    @property
+    def _store(self):
+        return _get_store(self._path, self._size, self._slots)
+
+    def _locked(self, operation, *args):
+        store = self._store
+        with store.lock:
+            locks.lock(store.file, locks.LOCK_EX)
+            try:
+                store.check()
+                return operation(store, *args)
+            finally:
+                locks.unlock(store.file)
+
+    def _digest(self, key, version):
+        key = self.make_and_validate_key(key, version=version)
+        return hashlib.md5(key.encode('utf-8')).digest()
+
+    def _expires(self, timeout):
+        expiry = self.get_backend_timeout(timeout)
+        return 0.0 if expiry is None else expiry
+
+    def get(self, key, default=None, version=None):
+        digest = self._digest(key, version)
+        data = self._locked(_Store.get, digest, time.time())
+        if data is None:
+            return default
+        try:
+            return pickle.loads(data)
+        except Exception:
+            # Damaged entry (or a class that no longer unpickles): a miss, and gone for good.
+            self._locked(_Store.delete, digest)
+            return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        data = pickle.dumps(value, self.pickle_protocol)
+        self._locked(_Store.set, self._digest(key, version), data, self._expires(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        digest = self._digest(key, version)
+        data = pickle.dumps(value, self.pickle_protocol)
+        expires = self._expires(timeout)
+
+        def _add(store):
+            if store.get(digest, time.time()) is not None:
+                return False
+            return store.set(digest, data, expires)
+
+        return self._locked(_add)
+
+    def incr(self, key, delta=1, version=None):
+        digest = self._digest(key, version)
+
+        def _incr(store):
+            now = time.time()
+            index = store._find(digest)
+            current = store.get(digest, now)
+            if current is None:
+                raise ValueError("Key '%s' not found" % key)
+            expires = store._read_slot(index)[3]
+            try:
+                value = pickle.loads(current)
+            except Exception:
+                store.delete(digest)
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            store.set(digest, pickle.dumps(value, self.pickle_protocol), expires)
+            return value
+
+        return self._locked(_incr)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._locked(_Store.touch, self._digest(key, version), self._expires(timeout), time.time())
+
+    def delete(self, key, version=None):
+        return self._locked(_Store.delete, self._digest(key, version))
+
+    def has_key(self, key, version=None):
+        return self._locked(_Store.get, self._digest(key, version), time.time()) is not None
+
+    def clear(self):
+        self._locked(_Store.clear)
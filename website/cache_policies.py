@@ -0,0 +1,82 @@
+"""
+Per-route HTTP caching policy (Cache-Control), applied by CachePolicyMiddleware.
+
+Browsers and shared caches (CDN, corporate proxies) may reuse a page for max-age / s-maxage
+seconds and keep serving it for stale-while-revalidate more while they refetch it in the
+background — repeat visits and back/forward navigation then cost no request at all.
+nginx's own micro-cache ignores these headers (it follows X-Accel-Expires and is purged on
+content change, website/nginx_cache.py).
+
+The policy is picked by URL name. Not applied to:
+- responses that already set Cache-Control (the view decides: @never_cache, pages with a
+  visitor's flash messages, last-known-good fallbacks);
+- responses that set a cookie, error responses, and logged-in users;
+- anything but GET/HEAD: always no-store.
+Routes not listed get no Cache-Control header.
+
+Keep in sync with the $published_cache_control map in nginx/techlynxpro.conf (published files
+are served by nginx without reaching Django).
+"""
+
+# Public pages: an admin edit reaches a repeat visitor within max-age.
+CONTENT = {'public': True, 'max_age': 300, 's_maxage': 600, 'stale_while_revalidate': 86400}
+# Pages that change about once a year.
+LEGAL = {'public': True, 'max_age': 3600, 's_maxage': 3600, 'stale_while_revalidate': 86400}
+# Form pages: forms redirect back to them with a flash message, which a page reused from the
+# browser cache would not show — always revalidate (answered by a 304 while unchanged).
+FORM_PAGE = {'public': True, 'no_cache': True}
+NO_STORE = {'no_store': True}
+# Crawler files; regenerated when posts are published, read once a day at most.
+CRAWLER = {'public': True, 'max_age': 86400, 's_maxage': 86400, 'stale_while_revalidate': 604800}
+
+ROUTE_POLICIES = {
+    'home': CONTENT,
+    'about': CONTENT,
+    'web_development': CONTENT,
+    'digital_marketing': CONTENT,
+    'ai_solutions': CONTENT,
+    'app_development': CONTENT,
+    'seo_audit': CONTENT,
+    'project_management': CONTENT,
+    'finance_accounting': CONTENT,
+    'content_production': CONTENT,
+    'virtual_assistance': CONTENT,
+    'bpo': CONTENT,
+    'industries': CONTENT,
+    'case_studies': CONTENT,
+    'case_study_detail': CONTENT,
+    'blog': CONTENT,
+    'all_blogs': CONTENT,
+    'blog_detail': CONTENT,
+    'testimonials': CONTENT,
+    'privacy_policy': LEGAL,
+    'terms_of_service': LEGAL,
+    'services': FORM_PAGE,
+    'contact': FORM_PAGE,
+    'careers': FORM_PAGE,
+    'newsletter_subscribe': NO_STORE,
+    'chatbot_query': NO_STORE,
+    'csrf_token': NO_STORE,
+    'django.contrib.sitemaps.views.sitemap': CRAWLER,
+    'robots': CRAWLER,
+}
+
+# Safe methods only: anything else (form POSTs, chatbot queries) is never stored.
+CACHEABLE_METHODS = ('GET', 'HEAD')
+# 304: a revalidated response carries the policy again (RFC 9111 §4.3.4).
+CACHEABLE_STATUSES = (200, 304)
+
+
+def policy_for(request, response):
+    """Cache-Control directives (patch_cache_control kwargs) for a response, or None to leave it."""
+    if request.method not in CACHEABLE_METHODS:
+        return NO_STORE
+    if response.has_header('Cache-Control') or response.cookies:
+        return None
+    if response.status_code not in CACHEABLE_STATUSES:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return None
+    match = getattr(request, 'resolver_match', None)
+    return ROUTE_POLICIES.get(match.url_name) if match else None
@@ -9,6 +9,8 @@ from django.conf import settings
 from bs4 import BeautifulSoup
 import re
 
+from . import invalidation_bus
+
 # Global cache for extracted context
 _cached_context = None
 
@@ -192,11 +194,22 @@ def get_chatbot_context():
     return _cached_context
 
 
-def refresh_context():
+def drop_context(name=''):
     """
-    Force refresh the cached context
-    Call this when templates are updated
+    Forget this worker's context; it is rebuilt on the next chatbot request
     """
     global _cached_context
     _cached_context = None
+
+
+def refresh_context():
+    """
+    Force refresh the cached context
+    Call this when templates are updated (every worker on every node rebuilds its copy)
+    """
+    drop_context()
+    invalidation_bus.publish('chatbot_context')
     return get_chatbot_context()
+
+
+invalidation_bus.subscribe('chatbot_context', drop_context, scope=invalidation_bus.PROCESS)
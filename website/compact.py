@@ -0,0 +1,145 @@
+"""
+Compact cache representation of model instances.
+
+A pickled model instance carries its whole __dict__ — every field name as a string key, the
+ModelState object, the model's import path — once per row. Content bundles and .cached() rows
+hold dozens of them, and every worker unpickles the lot on each cache read.
+
+pack() replaces each instance by a record (model label, field names, values): the label and the
+field-name tuple are the same objects for every row of a model, so pickle writes them once and
+refers back to them after that; a row costs little more than its values. select_related() objects
+and prefetch_related() lists are packed along with their instance. unpack() rebuilds the
+instances the way unpickling does (no __init__, no signals), so it is not slower than pickle.
+
+Every concrete field that was loaded is packed, not only the fields the templates read. A field
+left out here would come back as deferred, and the first template that reads it would run one
+query per row, with nothing to flag it. To trim a section, load fewer fields with .only() /
+.defer() on its queryset: deferred fields are already skipped, and stay deferred after unpack().
+
+    python manage.py measure_bundles        # pickled size and load time, plain vs packed
+"""
+
+from django.apps import apps
+from django.db import models
+from django.db.models.base import ModelState
+
+
+class Record(tuple):
+    """(label, attnames, values, related instances, back-references, prefetched lists) of one instance."""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return Record, (tuple(self),)
+
+
+# model → (label, attnames): shared per model so pickle memoizes them within one payload.
+_schemas = {}
+# label → model, for unpack()
+_models = {}
+
+
+class _PrefetchCache(dict):
+    """_prefetched_objects_cache that turns a relation's rows into its queryset on first access.
+
+    Building the related manager's filtered queryset costs more than unpacking the rows; most
+    relations of a cached bundle are never looked at on a given render.
+    """
+
+    def __init__(self, instance, rows):
+        super().__init__(rows)
+        self.instance = instance
+
+    def __getitem__(self, name):
+        value = super().__getitem__(name)
+        if isinstance(value, list):
+            # Without the entry the manager builds its plain filtered queryset; the rows go in
+            # as prefetch_related() would have left them.
+            del self[name]
+            queryset = getattr(self.instance, name).get_queryset()
+            queryset._result_cache = value
+            queryset._prefetch_done = True
+            self[name] = value = queryset
+        return value
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+
+def _schema(model):
+    schema = _schemas.get(model)
+    if schema is None:
+        schema = (model._meta.label, tuple(field.attname for field in model._meta.concrete_fields))
+        _schemas[model] = schema
+    return schema
+
+
+def _pack_instance(obj, parent=None):
+    label, attnames = _schema(type(obj))
+    # Deferred fields (.only()/.defer()) are not in __dict__ and stay deferred after unpacking.
+    present = tuple(name for name in attnames if name in obj.__dict__)
+    if present != attnames:
+        attnames = present
+    values = tuple(obj.__dict__[name] for name in attnames)
+    fields_cache = obj._state.fields_cache
+    # Rows of a prefetched list point back at their parent instance: restored on unpack.
+    back = tuple(name for name, value in fields_cache.items() if parent is not None and value is parent)
+    related = tuple(
+        (name, pack(value)) for name, value in fields_cache.items()
+        if name not in back and (value is None or isinstance(value, models.Model))
+    )
+    prefetched = tuple(
+        (name, [_pack_instance(item, parent=obj) for item in queryset])
+        for name, queryset in getattr(obj, '_prefetched_objects_cache', {}).items()
+        if isinstance(queryset, models.QuerySet)
+    )
+    return Record((label, attnames, values, related, back, prefetched))
+
+
+def _unpack_instance(record, db, parent=None):
+    label, attnames, values, related, back, prefetched = record
+    model = _models.get(label)
+    if model is None:
+        model = _models[label] = apps.get_model(label)
+    # What Model.__reduce__ / model_unpickle do, instead of the slower Model.from_db().
+    obj = model.__new__(model)
+    obj.__dict__.update(zip(attnames, values))
+    obj._state = state = ModelState()
+    state.adding = False
+    state.db = db
+    for name, value in related:
+        obj._state.fields_cache[name] = unpack(value, db)
+    for name in back:
+        obj._state.fields_cache[name] = parent
+    if prefetched:
+        obj._prefetched_objects_cache = _PrefetchCache(obj, {
+            name: [_unpack_instance(item, db, parent=obj) for item in items]
+            for name, items in prefetched
+        })
+    return obj
+
+
+def pack(value):
+    """Value with every model instance (also inside lists, tuples and dicts) replaced by a Record."""
+    if isinstance(value, models.Model):
+        return _pack_instance(value)
+    if isinstance(value, dict):
+        return {key: pack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [pack(item) for item in value]
+    if type(value) is tuple:
+        return tuple(pack(item) for item in value)
+    return value
+
+
+def unpack(value, db='default'):
+    """Inverse of pack(): fresh model instances, as if just loaded from the database."""
+    if isinstance(value, Record):
+        return _unpack_instance(value, db)
+    if isinstance(value, dict):
+        return {key: unpack(item, db) for key, item in value.items()}
+    if isinstance(value, list):
+        return [unpack(item, db) for item in value]
+    if type(value) is tuple:
+        return tuple(unpack(item, db) for item in value)
+    return value
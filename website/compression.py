@@ -0,0 +1,73 @@
+"""
+Precompression helpers for cached / published HTML.
+
+Pages are compressed once per content version (gzip and, when the optional `brotli` package is
+installed, Brotli) and the stored bytes are picked per request from Accept-Encoding —
+instead of GZipMiddleware re-compressing the same HTML on every hit.
+
+Streamed pages (website/streaming.py) are compressed chunk by chunk instead, flushing after each.
+"""
+
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only without it
+    brotli = None
+
+# Preference order when the client accepts several.
+ENCODINGS = ('br', 'gzip')
+
+
+def compress_variants(data, brotli_quality=9):
+    """{'identity': data, 'gzip': ..., 'br': ...} for a body (br only if brotli is installed)."""
+    variants = {
+        'identity': data,
+        # mtime=0: identical bytes for identical input (stable across workers / re-renders).
+        'gzip': gzip.compress(data, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=brotli_quality)
+    return variants
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of bytes, flushing after every chunk so each one can be sent at once."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    # wbits 16 + MAX_WBITS: gzip container.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts (q=0 entries excluded)."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q=') and q[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+def negotiate_encoding(request, variants=ENCODINGS):
+    """Best stored (or, by default, available) encoding for this request ('br', 'gzip' or 'identity')."""
+    accepted = accepted_encodings(request)
+    for coding in ENCODINGS:
+        if coding == 'br' and brotli is None:
+            continue
+        if coding in variants and (coding in accepted or '*' in accepted):
+            return coding
+    return 'identity'
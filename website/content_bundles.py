@@ -0,0 +1,332 @@
+"""
+Declarative page → model registry and cached per-page content bundles.
+
+Each registered page lists the sections of its template context (model + filters + ordering).
+get_page_bundle() loads all sections once and caches the resulting dict as a single object;
+an admin save/delete only invalidates the pages that actually read the changed model
+(website/signals.py). A page view then costs one cache read instead of one query per section.
+
+Pages with hand-written views (home, blog, careers, …) only declare the models they read, so
+their cached HTML / published files are invalidated just as precisely.
+
+Bundles are stored under the page's version, so a bundle built from pre-edit data while an
+edit commits lands under the old version and is never served. They are stored packed
+(website/compact.py): field values only, without the per-instance pickle overhead.
+"""
+
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from .compact import pack, unpack
+from .singletons import get_singleton
+
+PAGE_VERSION_PREFIX = 'website:page_version'
+BUNDLE_PREFIX = 'website:bundle'
+
+PAGES = {}
+PAGE_DEPENDENCIES = {}
+
+
+class Section:
+    """One context entry backed by a website model (referenced by name, resolved lazily)."""
+
+    def __init__(self, model_name, order_by=(), select_related=(), prefetch_related=(), **filters):
+        self.model_name = model_name
+        self.order_by = tuple(order_by)
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.filters = filters
+
+    @property
+    def model(self):
+        return apps.get_model('website', self.model_name)
+
+    def queryset(self):
+        qs = self.model.objects.filter(**self.filters)
+        if self.select_related:
+            qs = qs.select_related(*self.select_related)
+        if self.prefetch_related:
+            qs = qs.prefetch_related(*self.prefetch_related)
+        if self.order_by:
+            qs = qs.order_by(*self.order_by)
+        return qs
+
+    def models(self):
+        """The section's model plus models pulled in through select/prefetch_related."""
+        found = {self.model}
+        for path in self.select_related + self.prefetch_related:
+            model = self.model
+            for name in path.split('__'):
+                model = model._meta.get_field(name).related_model
+                found.add(model)
+        return found
+
+    def load(self):
+        raise NotImplementedError
+
+
+class One(Section):
+    """First matching row, or None (hero / CTA / section-heading singletons)."""
+
+    def load(self):
+        if self.order_by or self.select_related or self.prefetch_related:
+            return self.queryset().first()
+        # Plain singleton lookup: reuse this worker's copy while the model is unchanged.
+        return get_singleton(self.model, **self.filters)
+
+
+class Many(Section):
+    """All matching rows (optionally capped), evaluated to a list so it can be cached."""
+
+    def __init__(self, model_name, limit=None, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.limit = limit
+
+    def load(self):
+        qs = self.queryset()
+        if self.limit is not None:
+            qs = qs[:self.limit]
+        return list(qs)
+
+
+def register_page(name, **sections):
+    """Declare the context sections of a page (name = URL name of its view)."""
+    PAGES[name] = sections
+
+
+def register_dependencies(name, *model_names):
+    """Declare the models a hand-written view (and its template) reads — invalidation only."""
+    PAGE_DEPENDENCIES[name] = model_names
+
+
+def is_registered(name):
+    return name in PAGES or name in PAGE_DEPENDENCIES
+
+
+def registered_pages():
+    return list(PAGES) + [name for name in PAGE_DEPENDENCIES if name not in PAGES]
+
+
+def page_models(name):
+    models = {apps.get_model('website', model_name) for model_name in PAGE_DEPENDENCIES.get(name, ())}
+    for section in PAGES.get(name, {}).values():
+        models |= section.models()
+    return models
+
+
+def pages_for_model(model):
+    """Registered pages whose context reads the given model."""
+    concrete = model._meta.concrete_model
+    return [name for name in registered_pages() if concrete in page_models(name)]
+
+
+def _version_key(name):
+    return f'{PAGE_VERSION_PREFIX}:{name}'
+
+
+def get_page_version(name):
+    """Current content version of one registered page (bumped when its models change)."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_pages(names):
+    """Move the given pages to a new version; their cached bundles and HTML become unreachable."""
+    if names:
+        version = time.time_ns()
+        cache.set_many({_version_key(name): version for name in names}, None)
+
+
+def load_page_bundle(name):
+    """Run every section query for a page (no cache)."""
+    return {key: section.load() for key, section in PAGES[name].items()}
+
+
+def get_page_bundle(name):
+    """Template context for a registered page — cached until one of its models changes."""
+    key = f'{BUNDLE_PREFIX}:{name}:{get_page_version(name)}'
+    packed = cache.get(key)
+    if packed is None:
+        bundle = load_page_bundle(name)
+        cache.set(key, pack(bundle), settings.PAGE_CACHE_TIMEOUT)
+        return bundle
+    return unpack(packed)
+
+
+# ==================== PAGE REGISTRY ====================
+
+register_page(
+    'about',
+    seo=One('AboutPageSEO'),
+    hero=One('AboutPageHero', is_active=True),
+    mission_vision=One('AboutPageMissionVision', is_active=True),
+    advantage_section=One('AboutPageAdvantageSection', is_active=True),
+    advantages=Many('AboutPageAdvantage', is_active=True, order_by=['order']),
+    timeline_section=One('AboutPageTimelineSection', is_active=True),
+    timeline_items=Many('AboutPageTimeline', is_active=True, order_by=['order']),
+    team_section=One('AboutPageTeamSection', is_active=True),
+    team_members=Many('AboutPageTeamMember', is_active=True, order_by=['order'], limit=3),
+    cta=One('AboutPageCTA', is_active=True),
+)
+
+register_page(
+    'services',
+    hero=One('ServicesPageHero'),
+    services=Many('ServiceDetail', is_active=True, prefetch_related=['features'], order_by=['order']),
+    why_choose_section=One('WhyChooseSection'),
+    why_choose_items=Many('WhyChooseItem', is_active=True, order_by=['order']),
+    # Limit to 4 active images for 2x2 grid
+    why_choose_images=Many('WhyChooseImage', is_active=True, order_by=['order'], limit=4),
+    cta_section=One('ServicesPageCTA', is_active=True, prefetch_related=['checklist_items']),
+)
+
+register_page(
+    'web_development',
+    hero=One('WebDevHero', is_active=True),
+    services=Many('WebDevService', is_active=True),
+    stack_features=Many('WebDevStackFeature', is_active=True),
+    technologies=Many('WebDevTechnology', is_active=True),
+    process_steps=Many('WebDevProcess', is_active=True),
+    seo_benefits=Many('WebDevSEOBenefit', is_active=True),
+    seo_metrics=Many('WebDevSEOMetric', is_active=True),
+    cta=One('WebDevCTA', is_active=True),
+)
+
+register_page(
+    'digital_marketing',
+    hero=One('DigitalMarketingHero', is_active=True),
+    services=Many('DigitalMarketingService', is_active=True),
+    strategy_steps=Many('DigitalMarketingStrategy', is_active=True),
+    testimonials=Many('DigitalMarketingTestimonial', is_active=True),
+    metrics=Many('DigitalMarketingMetric', is_active=True),
+    cta=One('DigitalMarketingCTA', is_active=True),
+)
+
+register_page(
+    'ai_solutions',
+    hero=One('AISolutionsHero', is_active=True),
+    ai_services=Many('AIService', is_active=True, order_by=['order']),
+    ai_technologies=Many('AITechnology', is_active=True, order_by=['order']),
+    tech_details=Many('AITechnologyDetail', is_active=True, order_by=['order']),
+    implementation_steps=Many('AIImplementationStep', is_active=True, order_by=['order']),
+    roi_metrics=Many('AIROIMetric', is_active=True, order_by=['order']),
+    performance_metrics=Many('AIPerformanceMetric', is_active=True, order_by=['order']),
+    ai_testimonials=Many('AITestimonial', is_active=True, order_by=['order']),
+    cta_section=One('AISolutionsCTA', is_active=True),
+)
+
+register_page(
+    'app_development',
+    hero=One('AppDevHero', is_active=True),
+    services=Many('AppDevService', is_active=True),
+    stack_features=Many('AppDevStackFeature', is_active=True),
+    technologies=Many('AppDevTechnology', is_active=True),
+    process_steps=Many('AppDevProcess', is_active=True),
+    features=Many('AppDevFeature', is_active=True),
+    performance_metrics=Many('AppDevPerformanceMetric', is_active=True),
+    testimonials=Many('AppDevTestimonial', is_active=True),
+    cta=One('AppDevCTA', is_active=True),
+)
+
+register_page(
+    'seo_audit',
+    hero=One('SEOAuditHero', is_active=True),
+    seo_services=Many('SEOAuditService', is_active=True, order_by=['order']),
+    seo_tools=Many('SEOAuditTool', is_active=True, order_by=['order']),
+    tool_logos=Many('SEOAuditToolLogo', is_active=True, order_by=['order']),
+    process_steps=Many('SEOAuditProcess', is_active=True, order_by=['step_number']),
+    results=One('SEOAuditResult', is_active=True),
+    benefits=Many('SEOAuditBenefit', is_active=True, order_by=['order']),
+    health_metrics=Many('SEOAuditHealthMetric', is_active=True, order_by=['order']),
+    testimonials=Many('SEOAuditTestimonial', is_active=True, order_by=['order']),
+    cta_section=One('SEOAuditCTA', is_active=True),
+)
+
+register_page(
+    'project_management',
+    hero=One('PMHero', is_active=True),
+    services=Many('PMService', is_active=True, order_by=['order']),
+    tools=Many('PMTool', is_active=True, order_by=['order']),
+    tool_logos=Many('PMToolLogo', is_active=True, order_by=['order']),
+    process_steps=Many('PMProcess', is_active=True, order_by=['step_number']),
+    benefits=Many('PMBenefit', is_active=True, order_by=['order']),
+    metrics=Many('PMMetric', is_active=True, order_by=['order']),
+    testimonials=Many('PMTestimonial', is_active=True, order_by=['order']),
+    cta=One('PMCTA', is_active=True),
+)
+
+register_page(
+    'finance_accounting',
+    hero=One('FAHero', is_active=True),
+    services=Many('FAService', is_active=True, order_by=['order']),
+    tools=Many('FATool', is_active=True, order_by=['order']),
+    process_steps=Many('FAProcess', is_active=True, order_by=['order']),
+    benefits=Many('FABenefit', is_active=True, order_by=['order']),
+    testimonials=Many('FATestimonial', is_active=True, order_by=['order']),
+    cta=One('FACTA', is_active=True),
+)
+
+register_page(
+    'content_production',
+    services=Many('CPService', is_active=True),
+    tools=Many('CPTool', is_active=True),
+    technologies=Many('CPTechnology', is_active=True),
+    benefits=Many('CPBenefit', is_active=True),
+    process_steps=Many('CPProcessStep', is_active=True),
+    metrics=Many('CPMetric', is_active=True),
+    testimonials=Many('CPTestimonial', is_active=True),
+)
+
+register_page(
+    'virtual_assistance',
+    hero=One('VAHero', is_active=True),
+    services=Many('VAService', is_active=True, order_by=['order']),
+    benefits=Many('VABenefit', is_active=True, order_by=['order']),
+    cta=One('VACTA', is_active=True),
+)
+
+register_page(
+    'bpo',
+    hero=One('BPOHero', is_active=True),
+    services=Many('BPOService', is_active=True, order_by=['order']),
+    benefits=Many('BPOBenefit', is_active=True, order_by=['order']),
+    process_steps=Many('BPOProcessStep', is_active=True, order_by=['order']),
+    cta=One('BPOCTA', is_active=True),
+)
+
+
+# ==================== HAND-WRITTEN VIEWS (dependencies only) ====================
+
+register_dependencies(
+    'home',
+    'HeroSection', 'HeroBenefit', 'CompanyStat', 'Service', 'Benefit', 'Guarantee',
+    'CaseStudy', 'CaseStudyMetric', 'Testimonial', 'Partner', 'CTASection',
+)
+register_dependencies('privacy_policy', 'PrivacyPolicy')
+register_dependencies('terms_of_service', 'TermsOfService')
+register_dependencies('industries')
+register_dependencies('case_studies', 'CaseStudy')
+register_dependencies('case_study_detail', 'CaseStudy', 'CaseStudyMetric', 'CaseStudiesPageCTA')
+register_dependencies('blog', 'BlogCategory', 'BlogPost')
+register_dependencies('all_blogs', 'BlogCategory', 'BlogPost')
+register_dependencies('blog_detail', 'BlogCategory', 'BlogPost')
+register_dependencies(
+    'careers',
+    'CareersHero', 'CareersStat', 'JobDepartment', 'JobLocation', 'JobOpening',
+    'TalentManagement', 'TalentFeature',
+)
+register_dependencies(
+    'testimonials',
+    'TestimonialsPageSEO', 'TestimonialsPageHero', 'TestimonialsPageWhyChoose',
+    'TestimonialsPageWhyChooseReason', 'TestimonialsPageCTA', 'TestimonialsPageMetric',
+    'AITestimonial', 'DigitalMarketingTestimonial', 'AppDevTestimonial', 'SEOAuditTestimonial',
+    'PMTestimonial', 'FATestimonial', 'CPTestimonial',
+)
+register_dependencies('contact', 'ContactPage', 'ContactPageFeature', 'ContactPageFAQ')
@@ -0,0 +1,192 @@
+"""
+HTTP geolocation providers, queried hedged and in parallel (used by website/geolocation.py).
+
+query_providers() asks the first provider and, if no country comes back within
+GEOIP_HEDGE_DELAY seconds (or it fails), the next one as well, and so on. The first country
+received wins. The whole lookup ends at GEOIP_LOOKUP_DEADLINE: one timeout at worst instead of
+one per provider. Usually the first provider answers within the hedge delay, so the others'
+quota is left alone.
+
+Each provider is skipped without a request when:
+- its circuit breaker is open: FAILURE_THRESHOLD errors (timeouts, 5xx) within FAILURE_WINDOW,
+  or a 429, open it for BREAKER_OPEN_FOR seconds (a 429's Retry-After if longer); or
+- its token bucket is empty. The bucket is sized from the provider's published rate limit and
+  refills continuously: burst + (limit - burst) per period never exceeds the limit in any period.
+Breaker and bucket state live in the shared cache, so all workers on the host (which share its
+public IP, and so the providers' limits) see the same state.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+STATE_PREFIX = 'website:geo_provider'
+FAILURE_THRESHOLD = 3
+FAILURE_WINDOW = 5 * 60
+BREAKER_OPEN_FOR = 2 * 60
+# Bucket updates are tiny; a worker that can't get the bucket lock in this many tries skips the provider.
+_BUCKET_LOCK_TRIES = 10
+_BUCKET_LOCK_WAIT = 0.005
+
+
+def _parse_ip_api(response):
+    data = response.json()
+    if data.get('status') == 'success':
+        return (data.get('country') or '').strip()
+    return None
+
+
+def _parse_ipapi_co(response):
+    country = response.text.strip()
+    return country if country not in ('None', 'Undefined') else None
+
+
+def _parse_ipgeolocation(response):
+    return (response.json().get('country_name') or '').strip()
+
+
+class NoProviderAvailable(Exception):
+    """Every provider is skipped (breaker open or out of tokens): nothing was asked."""
+
+
+class Provider:
+    def __init__(self, name, url, parse, limit, period, burst):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.burst = burst
+        self.refill_rate = (limit - burst) / period  # tokens per second
+
+    def key(self, part):
+        return f'{STATE_PREFIX}:{self.name}:{part}'
+
+
+# In order of preference. ip-api.com's https endpoint (tried before) needs a paid key, so it is
+# not listed a second time.
+PROVIDERS = (
+    Provider('ip-api', 'http://ip-api.com/json/{ip}?fields=status,country', _parse_ip_api,
+             limit=45, period=60, burst=5),
+    Provider('ipapi.co', 'https://ipapi.co/{ip}/country_name/', _parse_ipapi_co,
+             limit=1000, period=24 * 60 * 60, burst=20),
+    Provider('ipgeolocation', 'https://api.ipgeolocation.io/ipgeo?ip={ip}', _parse_ipgeolocation,
+             limit=1000, period=24 * 60 * 60, burst=20),
+)
+
+_executor = ThreadPoolExecutor(max_workers=2 * len(PROVIDERS), thread_name_prefix='geo-provider')
+
+
+def is_open(provider):
+    return cache.get(provider.key('open')) is not None
+
+
+def _record_failure(provider, open_for=None):
+    key = provider.key('failures')
+    cache.add(key, 0, FAILURE_WINDOW)
+    try:
+        failures = cache.incr(key)
+    except ValueError:  # expired in between
+        failures = 1
+    if open_for is not None or failures >= FAILURE_THRESHOLD:
+        open_for = max(open_for or 0, BREAKER_OPEN_FOR)
+        cache.set(provider.key('open'), time.time() + open_for, open_for)
+        cache.delete(key)
+        logger.warning("Geolocation: %s skipped for %ss", provider.name, open_for)
+
+
+def _record_success(provider):
+    cache.delete(provider.key('failures'))
+
+
+def take_token(provider):
+    """Spend one of the provider's request tokens; False if its bucket is empty."""
+    lock = FileLock(provider.key('bucket'), timeout=5)
+    for _ in range(_BUCKET_LOCK_TRIES):
+        if lock.acquire():
+            break
+        time.sleep(_BUCKET_LOCK_WAIT)
+    else:
+        return False
+    try:
+        now = time.time()
+        tokens, updated = cache.get(provider.key('tokens')) or (provider.burst, now)
+        tokens = min(provider.burst, tokens + (now - updated) * provider.refill_rate)
+        if tokens < 1:
+            return False
+        cache.set(provider.key('tokens'), (tokens - 1, now), None)
+        return True
+    finally:
+        lock.release()
+
+
+def _retry_after(response):
+    try:
+        return int(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+def _ask(provider, ip_address, timeout):
+    """Country from one provider, or None (failures feed its circuit breaker)."""
+    try:
+        response = requests.get(provider.url.format(ip=ip_address), timeout=timeout)
+    except requests.RequestException as exc:
+        logger.info("Geolocation: %s failed: %s", provider.name, exc)
+        _record_failure(provider)
+        return None
+    if response.status_code == 429:
+        _record_failure(provider, open_for=_retry_after(response))
+        return None
+    if response.status_code >= 500:
+        _record_failure(provider)
+        return None
+    _record_success(provider)
+    if response.status_code != 200:
+        return None
+    try:
+        country = provider.parse(response)
+    except ValueError:  # not JSON
+        return None
+    return country if country and country != 'None' else None
+
+
+def query_providers(ip_address):
+    """Country name for a public IP address from the HTTP providers, or None if none knows it."""
+    deadline = time.monotonic() + settings.GEOIP_LOOKUP_DEADLINE
+    candidates = iter(PROVIDERS)
+    running = set()
+
+    def launch_next():
+        for provider in candidates:
+            if not is_open(provider) and take_token(provider):
+                timeout = max(deadline - time.monotonic(), 0.1)
+                running.add(_executor.submit(_ask, provider, ip_address, timeout))
+                return
+
+    launch_next()
+    if not running:
+        raise NoProviderAvailable(ip_address)
+    while running:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(running, timeout=min(remaining, settings.GEOIP_HEDGE_DELAY), return_when=FIRST_COMPLETED)
+        for future in done:
+            running.discard(future)
+            try:
+                country = future.result()
+            except Exception:
+                logger.exception("Geolocation: provider lookup for %s crashed", ip_address)
+                continue
+            if country:
+                return country
+        # Failed, found nothing, or slower than the hedge delay: bring in the next provider.
+        launch_next()
+    return None
@@ -0,0 +1,195 @@
+"""
+Offline IP → country lookups from a local range database (GEOIP_DB_PATH).
+
+`python manage.py import_geoip <ranges.csv>` converts a CSV of IP ranges, for example IP2Location
+LITE DB1 or DB-IP "IP to Country Lite", into one binary file. The file holds a sorted table per
+address family:
+    starts   fixed-width big-endian addresses (4 bytes for IPv4, 16 for IPv6), ascending
+    ends     the same width, inclusive
+    country  2-byte index into the country names stored at the end of the file
+A lookup is a binary search over the memory-mapped starts. No parsing or loading happens at
+startup, and every worker shares the same pages through the OS page cache. Compared to the
+HTTP providers, a lookup takes microseconds.
+
+The file is replaced atomically by the import command. Each process notices the new file on its
+next lookup (the inode/mtime changes) and maps it instead.
+"""
+
+import bisect
+import ipaddress
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+
+MAGIC = b'TLGEOIP1'
+_HEADER = struct.Struct('<8sIII')  # magic, IPv4 ranges, IPv6 ranges, countries
+_COUNTRY = struct.Struct('>H')
+_WIDTHS = {4: 4, 6: 16}
+_IPV4_MAPPED = ipaddress.ip_network('::ffff:0:0/96')
+
+
+class _Column:
+    """Fixed-width records in a buffer, indexable (bisect works on it without copying)."""
+
+    def __init__(self, buffer, offset, width, count):
+        self.buffer = buffer
+        self.offset = offset
+        self.width = width
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start = self.offset + index * self.width
+        return self.buffer[start:start + self.width]
+
+
+class RangeDatabase:
+    """A mapped range database file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count4, count6, country_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an IP range database')
+        offset = _HEADER.size
+        self.tables = {}
+        for version, count in ((4, count4), (6, count6)):
+            width = _WIDTHS[version]
+            starts = _Column(self._map, offset, width, count)
+            ends = _Column(self._map, offset + width * count, width, count)
+            countries = _Column(self._map, offset + 2 * width * count, _COUNTRY.size, count)
+            self.tables[version] = (starts, ends, countries)
+            offset += (2 * width + _COUNTRY.size) * count
+        self.countries = self._map[offset:].decode('utf-8').split('\n')[:country_count]
+
+    def is_current(self, stat):
+        return (self.stat.st_ino, self.stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+
+    def lookup(self, address):
+        """Country name for an ip_address() value, or None if no range covers it."""
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        starts, ends, countries = self.tables[address.version]
+        key = address.packed
+        index = bisect.bisect_right(starts, key) - 1
+        if index < 0 or ends[index] < key:
+            return None
+        return self.countries[_COUNTRY.unpack(countries[index])[0]]
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """The current range database (re-mapped after an import), or None if there is none."""
+    global _database
+    try:
+        stat = os.stat(settings.GEOIP_DB_PATH)
+    except FileNotFoundError:
+        return None
+    database = _database
+    if database is None or not database.is_current(stat):
+        with _database_lock:
+            if _database is None or not _database.is_current(stat):
+                # The old map is left to the garbage collector: other threads may still read it.
+                _database = RangeDatabase(settings.GEOIP_DB_PATH)
+            database = _database
+    return database
+
+
+def lookup_country(ip_address):
+    """Country name for an IP address string from the local database; None if unknown/no database."""
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+    database = get_database()
+    return database.lookup(address) if database is not None else None
+
+
+def parse_address(value):
+    """ip_address() for a dotted/colon address or a decimal integer (IP2Location CSVs)."""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return ipaddress.IPv4Address(number) if number <= 0xFFFFFFFF else ipaddress.IPv6Address(number)
+    return ipaddress.ip_address(value)
+
+
+def _normalize(start, end):
+    """(version, start, end, mapped) with IPv4-mapped IPv6 ranges stored as IPv4 (mapped=True)."""
+    if start.version == 6 and start in _IPV4_MAPPED and end in _IPV4_MAPPED:
+        return 4, start.ipv4_mapped, end.ipv4_mapped, True
+    if start.version != end.version:
+        raise ValueError(f'range {start}-{end} mixes IPv4 and IPv6')
+    return start.version, start, end, False
+
+
+def write_database(ranges, path):
+    """
+    Write (start, end, country) ranges — ip_address() values, inclusive — to a database file.
+
+    Ranges are sorted; adjacent ranges of the same country are merged and overlapping ones
+    rejected. IPv4-mapped (::ffff:) ranges are used only when no plain IPv4 ranges are given:
+    IPv6 CSVs such as IP2Location's repeat the whole IPv4 table in that form. The file is
+    replaced atomically. Returns {4: count, 6: count}.
+    """
+    tables = {4: [], 6: []}
+    mapped = []
+    for start, end, country in ranges:
+        version, start, end, is_mapped = _normalize(start, end)
+        if end < start:
+            raise ValueError(f'range {start}-{end} ends before it starts')
+        (mapped if is_mapped else tables[version]).append((int(start), int(end), country))
+    if not tables[4]:
+        tables[4] = mapped
+
+    countries = {}
+    sections = []
+    counts = {}
+    for version in (4, 6):
+        width = _WIDTHS[version]
+        merged = []
+        for start, end, country in sorted(tables[version]):
+            if merged and start <= merged[-1][1]:
+                raise ValueError(
+                    f'overlapping ranges at {ipaddress.ip_address(start)} '
+                    f'(previous range ends at {ipaddress.ip_address(merged[-1][1])})'
+                )
+            if merged and start == merged[-1][1] + 1 and country == merged[-1][2]:
+                merged[-1] = (merged[-1][0], end, country)
+            else:
+                merged.append((start, end, country))
+        counts[version] = len(merged)
+        sections.append(b''.join(start.to_bytes(width, 'big') for start, _, _ in merged))
+        sections.append(b''.join(end.to_bytes(width, 'big') for _, end, _ in merged))
+        sections.append(b''.join(
+            _COUNTRY.pack(countries.setdefault(country, len(countries))) for _, _, country in merged
+        ))
+    if len(countries) > 0xFFFF:
+        raise ValueError('too many distinct countries')
+
+    names = '\n'.join(countries).encode('utf-8')  # dicts keep insertion order = index order
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.geoip-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, counts[4], counts[6], len(countries)))
+            for section in sections:
+                f.write(section)
+            f.write(names)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return counts
@@ -0,0 +1,193 @@
+"""
+IP → country for contact inquiries, resolved off the request path.
+
+Form views save the inquiry with country COUNTRY_PENDING and call schedule_country_lookup().
+Once the transaction has committed, the inquiry id is queued for this process's lookup thread.
+That thread runs lookup_ip_country() and writes the result with a single UPDATE. A form POST
+then costs only its database write, not a round of provider requests.
+
+get_country_from_ip() answers from the offline range database (website/geoip.py) when it has
+one, and asks the HTTP providers (website/geo_providers.py) only for addresses the database
+doesn't cover. Provider answers are kept in the shared cache for GEOIP_CACHE_TIMEOUT, failures
+for GEOIP_NEGATIVE_CACHE_TIMEOUT, so each address costs at most one round of API calls per
+period, across all workers.
+
+When every provider is being skipped (breakers open, rate limits spent) the row stays pending
+rather than being marked Unknown. Ids still queued when a worker exits are lost, so their rows
+stay pending too. The lookup thread resolves rows that have been pending longer than
+PENDING_SWEEP_AFTER when it starts (gunicorn post_worker_init) and again every
+PENDING_SWEEP_AFTER; only one worker per host sweeps at a time.
+`python manage.py resolve_countries` runs the same sweep from cron or by hand.
+"""
+
+import ipaddress
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .geo_providers import NoProviderAvailable, query_providers
+from .geoip import lookup_country
+from .locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_PREFIX = 'website:geo'
+
+COUNTRY_PENDING = 'Pending'
+UNKNOWN_COUNTRY = 'Unknown'
+LOCAL_COUNTRY = 'Local/Unknown'
+
+# Rows pending longer than this were lost by a worker that exited before resolving them.
+PENDING_SWEEP_AFTER = timedelta(minutes=5)
+# Upper bound on a sweep (one provider deadline per row, one row at a time).
+SWEEP_LOCK_TIMEOUT = 60 * 60
+# Queued lookups per process; beyond that a row waits for the next sweep.
+QUEUE_SIZE = 1000
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_country_from_ip(ip_address):
+    """
+    Country name for an IP address: LOCAL_COUNTRY for non-public addresses, UNKNOWN_COUNTRY if
+    unparseable or not found. Order: offline range database, shared result cache, HTTP providers.
+    """
+    try:
+        return lookup_ip_country(ip_address)
+    except NoProviderAvailable:
+        return UNKNOWN_COUNTRY
+
+
+def lookup_ip_country(ip_address):
+    """get_country_from_ip(), but raises NoProviderAvailable when every provider is being skipped."""
+    if not ip_address:
+        return UNKNOWN_COUNTRY
+    try:
+        address = ipaddress.ip_address(ip_address.strip())
+    except ValueError:
+        return UNKNOWN_COUNTRY  # never pass a malformed X-Forwarded-For value on to the APIs
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    if not address.is_global:  # private, loopback, link-local, CGNAT, reserved…
+        return LOCAL_COUNTRY
+    ip_address = str(address)  # canonical form: one cache entry per address
+
+    # Offline range database (website/geoip.py); the APIs below only for addresses it doesn't cover
+    country = lookup_country(ip_address)
+    if country:
+        return country
+
+    key = f'{RESULT_CACHE_PREFIX}:{ip_address}'
+    country = cache.get(key)
+    if country is not None:
+        return country
+    country = query_providers(ip_address)  # NoProviderAvailable: nothing remembered
+    if country:
+        cache.set(key, country, settings.GEOIP_CACHE_TIMEOUT)
+        return country
+    # Failed lookups are remembered too (shorter): bots retrying from one address cost one lookup.
+    cache.set(key, UNKNOWN_COUNTRY, settings.GEOIP_NEGATIVE_CACHE_TIMEOUT)
+    return UNKNOWN_COUNTRY
+
+
+def resolve_inquiry_country(inquiry_id):
+    """
+    Look up and store the country of a pending inquiry; the country, or None if not pending.
+    Raises NoProviderAvailable, leaving the row pending for a later sweep.
+    """
+    from .models import ContactInquiry
+
+    pending = ContactInquiry.objects.filter(pk=inquiry_id, country=COUNTRY_PENDING)
+    ips = list(pending.values_list('ip_address', flat=True))
+    if not ips:
+        return None
+    country = lookup_ip_country(ips[0])
+    # Still pending: an admin may have filled it in during the lookup.
+    pending.update(country=country)
+    return country
+
+
+def resolve_pending(older_than=None, limit=None):
+    """
+    Resolve pending inquiries (optionally only those older than a timedelta); count resolved.
+    Rows whose lookup found no provider available stay pending.
+    """
+    from .models import ContactInquiry
+
+    pending = ContactInquiry.objects.filter(country=COUNTRY_PENDING).order_by('pk')
+    if older_than is not None:
+        pending = pending.filter(created_at__lt=timezone.now() - older_than)
+    resolved = 0
+    for inquiry_id in list(pending.values_list('pk', flat=True)[:limit]):
+        try:
+            resolved += resolve_inquiry_country(inquiry_id) is not None
+        except NoProviderAvailable:
+            continue  # other rows may still be covered by the range database or the cache
+    return resolved
+
+
+def _sweep():
+    lock = FileLock('geolocation:sweep', timeout=SWEEP_LOCK_TIMEOUT)
+    if not lock.acquire():
+        return  # another worker is sweeping
+    try:
+        resolved = resolve_pending(older_than=PENDING_SWEEP_AFTER)
+        if resolved:
+            logger.info("Geolocation: resolved %s inquiries left pending", resolved)
+    finally:
+        lock.release()
+
+
+def _run():
+    next_sweep = 0
+    while True:
+        close_old_connections()
+        if time.monotonic() >= next_sweep:
+            # Rows left pending: ids lost with an exited worker, lookups with no provider available.
+            try:
+                _sweep()
+            except Exception:
+                logger.exception("Geolocation: sweep of pending inquiries failed")
+            next_sweep = time.monotonic() + PENDING_SWEEP_AFTER.total_seconds()
+        try:
+            inquiry_id = _queue.get(timeout=max(next_sweep - time.monotonic(), 0))
+        except queue.Empty:
+            continue
+        close_old_connections()
+        try:
+            resolve_inquiry_country(inquiry_id)
+        except NoProviderAvailable:
+            logger.info("Geolocation: no provider available, inquiry %s left pending", inquiry_id)
+        except Exception:
+            logger.exception("Geolocation: lookup for inquiry %s failed (left pending)", inquiry_id)
+
+
+def start_worker():
+    """Start this process's lookup thread (idempotent); it first sweeps rows left pending."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='geolocation', daemon=True)
+            _worker.start()
+
+
+def _enqueue(inquiry_id):
+    start_worker()
+    try:
+        _queue.put_nowait(inquiry_id)
+    except queue.Full:
+        logger.warning("Geolocation: queue full, inquiry %s left for the next sweep", inquiry_id)
+
+
+def schedule_country_lookup(inquiry):
+    """Resolve a saved inquiry's country in the background once its transaction commits."""
+    transaction.on_commit(lambda: _enqueue(inquiry.pk))
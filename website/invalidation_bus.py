@@ -0,0 +1,217 @@
+"""
+Cache invalidation broadcast between app nodes (and the workers of each node).
+
+Every cache layer here lives on one host: the shared mmap cache with its page/bundle/table/
+singleton versions, the published files, nginx's micro-cache and per-process state such as the
+chatbot context. website/signals.py invalidates them on the node that saved the change and
+publishes an event; every worker of every node polls the bus and runs the subscribed handlers:
+
+- scope NODE: once per node (the first worker to claim the event in the shared cache runs it),
+  skipped on the node the event came from — it already invalidated locally;
+- scope PROCESS: in every worker except the one that published the event.
+
+    subscribe('model', handler)                        # handler(name), e.g. 'website.Partner'
+    subscribe('chatbot_context', handler, scope=PROCESS)
+    publish('model', 'website.Partner')
+
+Backends (INVALIDATION_BUS_URL):
+- empty (default): an outbox table in the site database (CacheInvalidation). Events are written
+  in the saving transaction, so a rolled-back edit publishes nothing.
+- redis://host:6379/0: a Redis stream (needs the optional `redis` package), published after commit.
+
+Workers start listening in gunicorn's post_worker_init hook (start_listener()). The bus is off
+(INVALIDATION_BUS_POLL_INTERVAL 0) unless INVALIDATION_BUS_URL or NODE_NAME is set: a single node
+has nothing to broadcast to, so it neither polls nor writes events.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a redis:// INVALIDATION_BUS_URL
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+NODE = 'node'
+PROCESS = 'process'
+
+NODE_CURSOR_KEY = 'website:bus_cursor'
+APPLIED_PREFIX = 'website:bus_applied'
+# Events kept in the outbox / stream; a node down longer than this misses events.
+RETENTION = 60 * 60 * 24
+READ_BATCH = 500
+
+# kind → [(handler, scope)]
+_handlers = {}
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def subscribe(kind, handler, scope=NODE):
+    """Call handler(name) for every event of this kind published by another node (or process)."""
+    _handlers.setdefault(kind, []).append((handler, scope))
+
+
+def process_origin():
+    return f'{settings.NODE_NAME}:{os.getpid()}'
+
+
+def _origin_node(origin):
+    return origin.rsplit(':', 1)[0]
+
+
+class DatabaseBus:
+    """Outbox table in the site database (shared by every node that serves the site)."""
+
+    def publish(self, kind, name, origin):
+        from .models import CacheInvalidation
+        event = CacheInvalidation.objects.create(kind=kind, name=name, origin=origin)
+        if event.pk % 100 == 0:
+            cutoff = timezone.now() - timedelta(seconds=RETENTION)
+            CacheInvalidation.objects.filter(created_at__lt=cutoff).delete()
+
+    def publish_on_commit(self, kind, name, origin):
+        # Part of the saving transaction: published exactly when the edit commits.
+        self.publish(kind, name, origin)
+
+    def latest(self):
+        from .models import CacheInvalidation
+        last = CacheInvalidation.objects.order_by('-id').values_list('id', flat=True).first()
+        return last or 0
+
+    def read(self, after):
+        """Up to READ_BATCH events after the cursor: [(cursor, kind, name, origin)]."""
+        from .models import CacheInvalidation
+        return list(
+            CacheInvalidation.objects.filter(id__gt=after).order_by('id')
+            .values_list('id', 'kind', 'name', 'origin')[:READ_BATCH]
+        )
+
+
+class RedisBus:
+    """Redis stream; for nodes that share a Redis server rather than the database."""
+
+    STREAM = 'website:invalidation'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('INVALIDATION_BUS_URL is a redis:// URL but the redis package is not installed.')
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def publish(self, kind, name, origin):
+        self.client.xadd(
+            self.STREAM, {'kind': kind, 'name': name, 'origin': origin},
+            minid=f'{int((time.time() - RETENTION) * 1000)}-0',
+        )
+
+    def publish_on_commit(self, kind, name, origin):
+        transaction.on_commit(lambda: self.publish(kind, name, origin))
+
+    def latest(self):
+        last = self.client.xrevrange(self.STREAM, count=1)
+        return last[0][0] if last else '0-0'
+
+    def read(self, after):
+        entries = self.client.xrange(self.STREAM, min=f'({after}', count=READ_BATCH)
+        return [(entry_id, fields['kind'], fields['name'], fields['origin']) for entry_id, fields in entries]
+
+
+_bus = None
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        url = settings.INVALIDATION_BUS_URL
+        _bus = RedisBus(url) if url.startswith(('redis://', 'rediss://', 'unix://')) else DatabaseBus()
+    return _bus
+
+
+def is_enabled():
+    return settings.INVALIDATION_BUS_POLL_INTERVAL > 0
+
+
+def publish(kind, name=''):
+    """Broadcast an event to every other node/worker (inside a transaction: when it commits)."""
+    if is_enabled():
+        get_bus().publish_on_commit(kind, name, process_origin())
+
+
+def _claim(cursor):
+    """True for the first worker of this node to see the event."""
+    return cache.add(f'{APPLIED_PREFIX}:{cursor}', 1, RETENTION)
+
+
+def _run(kind, name, scope):
+    for handler, handler_scope in _handlers.get(kind, ()):
+        if handler_scope != scope:
+            continue
+        try:
+            handler(name)
+        except Exception:
+            logger.exception("Invalidation bus: %s handler for %s %s failed", scope, kind, name)
+
+
+def poll(cursor):
+    """Apply every event after the cursor; returns the new cursor."""
+    bus = get_bus()
+    me = process_origin()
+    while True:
+        events = bus.read(cursor)
+        if not events:
+            return cursor
+        node_work, process_work = [], []
+        for event_cursor, kind, name, origin in events:
+            if _origin_node(origin) != settings.NODE_NAME and _claim(event_cursor):
+                node_work.append((kind, name))
+            if origin != me:
+                process_work.append((kind, name))
+        # An admin save publishes one event per saved row: run each (kind, name) once per batch.
+        for kind, name in dict.fromkeys(node_work):
+            _run(kind, name, NODE)
+        for kind, name in dict.fromkeys(process_work):
+            _run(kind, name, PROCESS)
+        cursor = events[-1][0]
+        cache.set(NODE_CURSOR_KEY, cursor, None)
+        if len(events) < READ_BATCH:
+            return cursor
+
+
+def _listen(interval):
+    cursor = None
+    while True:
+        close_old_connections()
+        try:
+            if cursor is None:
+                # Resume where this node stopped (events missed while all its workers were down).
+                cursor = cache.get(NODE_CURSOR_KEY)
+                if cursor is None:
+                    cursor = get_bus().latest()
+            cursor = poll(cursor)
+        except Exception:
+            logger.exception("Invalidation bus: poll failed")
+        time.sleep(interval)
+
+
+def start_listener():
+    """Start this worker's polling thread (once per process); no-op if polling is disabled."""
+    global _listener
+    if not is_enabled():
+        return None
+    interval = settings.INVALIDATION_BUS_POLL_INTERVAL
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive() or _listener.pid != os.getpid():
+            _listener = threading.Thread(target=_listen, args=(interval,), name='invalidation-bus', daemon=True)
+            _listener.pid = os.getpid()
+            _listener.start()
+    return _listener
@@ -0,0 +1,70 @@
+"""
+Last-known-good copy of every cached page, kept on disk for when the database is unavailable.
+
+Each time the page cache stores a page without a query string, the same entry is written to
+LAST_GOOD_DIR (one file per page cache key). These files are never invalidated: they are the
+latest successful render of the URL, served by DatabaseUnavailableMiddleware when a view fails
+with a database error (SQLite locked by a migration or backup, file briefly missing). Pages with
+query strings are left out (any visitor can make up new ones), and the directory is capped at
+LAST_GOOD_MAX_FILES: beyond that the least recently written copies are removed.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _path(key):
+    # Page cache keys are '<prefix>:<md5 of the URL>'.
+    return Path(settings.LAST_GOOD_DIR) / f'{key.rsplit(":", 1)[-1]}.page'
+
+
+def _prune(directory):
+    """Remove the least recently written copies beyond LAST_GOOD_MAX_FILES."""
+    pages = []
+    for path in directory.glob('*.page'):
+        try:
+            pages.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue  # removed by another worker
+    pages.sort()
+    for _, path in pages[:max(len(pages) - settings.LAST_GOOD_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def save_page(key, entry):
+    """Replace the stored copy of a page (best effort: a failed write never fails the request)."""
+    target = _path(key)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not target.exists()
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.last-good-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if is_new:
+            _prune(target.parent)
+    except OSError:
+        logger.warning("Last-good copy of %s not written", key, exc_info=True)
+
+
+def load_page(key):
+    """The stored page cache entry for a key, or None."""
+    try:
+        with open(_path(key), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError):
+        logger.warning("Last-good copy of %s unreadable", key, exc_info=True)
+        return None
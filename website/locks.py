@@ -0,0 +1,65 @@
+"""
+Cross-process locks built on lock files (O_CREAT | O_EXCL is atomic on a local filesystem).
+
+Used to make one gunicorn worker fill a cache entry while the others wait for it. The shared
+cache's add() is atomic too (website/cache_backends.py), but an entry can be evicted before its
+holder is done; a lock file stays until it is released or abandoned.
+
+A lock left behind by a killed worker is broken once it is older than its timeout; keep the
+timeout above the longest expected hold time (gunicorn kills a request after 30s).
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+class FileLock:
+    """Non-blocking named lock shared by all processes (and threads) on the host."""
+
+    def __init__(self, name, timeout=30):
+        digest = hashlib.md5(name.encode('utf-8')).hexdigest()
+        self.path = Path(settings.CACHE_LOCK_DIR) / f'{digest}.lock'
+        self.timeout = timeout
+        self.held = False
+
+    def acquire(self):
+        """Take the lock if it is free (or abandoned); True on success."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._break_if_abandoned():
+                    return False
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            self.held = True
+            return True
+        return False
+
+    def release(self):
+        if self.held:
+            self.path.unlink(missing_ok=True)
+            self.held = False
+
+    def locked(self):
+        """True while some process holds the lock."""
+        try:
+            return time.time() - self.path.stat().st_mtime < self.timeout
+        except FileNotFoundError:
+            return False
+
+    def _break_if_abandoned(self):
+        try:
+            age = time.time() - self.path.stat().st_mtime
+        except FileNotFoundError:
+            return True  # released in the meantime
+        if age < self.timeout:
+            return False
+        self.path.unlink(missing_ok=True)
+        return True
@@ -0,0 +1,98 @@
+"""
+Fill in the country of old contact inquiries saved as empty or 'Unknown' (lookups that timed out).
+
+    python manage.py backfill_countries
+    python manage.py backfill_countries --chunk-size 200 --dry-run
+    python manage.py backfill_countries --restart          # ignore the saved position
+
+Rows are read in primary-key order, a chunk at a time, as (pk, ip) pairs only. Each distinct IP is
+resolved once per run: from the offline database, the shared result cache, then the
+providers (website/geolocation.py). Each chunk's changes are written with one bulk_update in one
+transaction. After every chunk the last primary key is saved, so an interrupted run continues
+where it stopped. A finished run clears it: the next run retries whatever is still unresolved.
+
+The providers' rate limits are respected: when all of them are out of tokens or switched off
+by their circuit breaker, the command waits (--wait seconds) and tries again, instead of
+writing 'Unknown'.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from website.geo_providers import NoProviderAvailable
+from website.geolocation import UNKNOWN_COUNTRY, lookup_ip_country
+from website.models import ContactInquiry
+
+CHECKPOINT_KEY = 'website:backfill_countries:last_pk'
+MISSING_COUNTRIES = ('', UNKNOWN_COUNTRY)
+
+
+class Command(BaseCommand):
+    help = "Resolve the country of inquiries stored with an empty or 'Unknown' country, in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per read and per transaction (default: 500).')
+        parser.add_argument(
+            '--wait',
+            type=float,
+            default=60.0,
+            help='Seconds to wait when every provider is rate-limited or unavailable (default: 60).',
+        )
+        parser.add_argument('--restart', action='store_true', help='Start from the first row, not the saved position.')
+        parser.add_argument('--dry-run', action='store_true', help='Resolve and report, but write nothing.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['wait'] <= 0:
+            raise CommandError('--wait must be positive.')
+        dry_run = options['dry_run']
+
+        last_pk = 0 if options['restart'] else (cache.get(CHECKPOINT_KEY) or 0)
+        if last_pk:
+            self.stdout.write(f'Resuming after inquiry {last_pk} (--restart to start over).')
+        missing = (
+            ContactInquiry.objects.filter(country__in=MISSING_COUNTRIES)
+            .exclude(ip_address__isnull=True)
+            .order_by('pk')
+        )
+        resolved = {}  # ip -> country, for the whole run
+        scanned = updated = 0
+        while True:
+            rows = list(missing.filter(pk__gt=last_pk).values_list('pk', 'ip_address', 'country')[:chunk_size])
+            if not rows:
+                break
+            changes = []
+            for pk, ip_address, country in rows:
+                if ip_address not in resolved:
+                    resolved[ip_address] = self._resolve(ip_address, options['wait'])
+                if resolved[ip_address] != country:
+                    changes.append(ContactInquiry(pk=pk, country=resolved[ip_address]))
+            if changes and not dry_run:
+                with transaction.atomic():
+                    ContactInquiry.objects.bulk_update(changes, ['country'])
+            scanned += len(rows)
+            updated += len(changes)
+            last_pk = rows[-1][0]
+            if not dry_run:
+                cache.set(CHECKPOINT_KEY, last_pk, None)
+            self.stdout.write(f'  up to inquiry {last_pk}: {len(changes)} of {len(rows)} updated')
+
+        if not dry_run:
+            cache.delete(CHECKPOINT_KEY)  # finished: the next run starts from the beginning
+        verb = 'would be updated' if dry_run else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{scanned} inquiries scanned, {len(resolved)} distinct IPs, {updated} {verb}.'
+        ))
+
+    def _resolve(self, ip_address, wait):
+        while True:
+            try:
+                return lookup_ip_country(ip_address)
+            except NoProviderAvailable:
+                self.stdout.write(f'  all geolocation providers rate-limited or down; waiting {wait:g}s')
+                time.sleep(wait)
@@ -0,0 +1,79 @@
+"""
+Build the offline IP → country database (website/geoip.py) from a CSV of IP ranges.
+
+    python manage.py import_geoip IP2LOCATION-LITE-DB1.CSV IP2LOCATION-LITE-DB1.IPV6.CSV
+    python manage.py import_geoip dbip-country-lite.csv.gz --output /path/to/ip-country.bin
+
+Each row: range start, range end (addresses or decimal integers), country code and optionally
+the country name. The name is stored when present, the code otherwise. Rows for unassigned
+ranges ('-', 'ZZ') and header lines are skipped. Import the IPv4 and IPv6 files together: the
+IPv4-mapped (::ffff:) copy of the IPv4 table in IPv6 files is then left out. Re-run to refresh
+the data: running workers pick up the new file on their next lookup.
+"""
+
+import csv
+import gzip
+import io
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website.geoip import parse_address, write_database
+
+UNASSIGNED = {'', '-', 'ZZ'}
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _read_ranges(path, skipped):
+    with _open(path) as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                skipped[0] += 1
+                continue
+            try:
+                start, end = parse_address(row[0]), parse_address(row[1])
+            except ValueError:
+                skipped[0] += 1  # header line or garbage
+                continue
+            code = row[2].strip()
+            name = row[3].strip() if len(row) > 3 else ''
+            if code in UNASSIGNED:
+                continue
+            yield start, end, name if name and name != '-' else code
+
+
+class Command(BaseCommand):
+    help = 'Import IP range CSV files into the offline IP-to-country database (GEOIP_DB_PATH).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV files (optionally .gz): start, end, code[, name].')
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Database file to write (default: GEOIP_DB_PATH).',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.GEOIP_DB_PATH
+        skipped = [0]
+        ranges = []
+        try:
+            for path in options['paths']:
+                ranges.extend(_read_ranges(path, skipped))
+            counts = write_database(ranges, output)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ValueError as exc:
+            raise CommandError(f'Invalid range data: {exc}')
+        if not counts[4] and not counts[6]:
+            self.stderr.write(self.style.WARNING('No ranges imported.'))
+        if skipped[0]:
+            self.stdout.write(f'Skipped {skipped[0]} unparseable rows.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {counts[4]} IPv4 and {counts[6]} IPv6 ranges to {output}.'
+        ))
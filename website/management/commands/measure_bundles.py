@@ -0,0 +1,63 @@
+"""
+Compare the cached size and load time of every content bundle, pickled as model instances
+versus packed (website/compact.py).
+
+    python manage.py measure_bundles
+    python manage.py measure_bundles --repeat 500
+"""
+
+import pickle
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.compact import pack, unpack
+from website.content_bundles import PAGES, load_page_bundle
+
+
+def _load_time(data, load, repeat):
+    """Mean seconds per load of the pickled data (best of 3 runs)."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            load(data)
+        elapsed = (time.perf_counter() - start) / repeat
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Report pickled size and load time of each page bundle, plain vs packed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Loads per timing run (default: 200).')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        if repeat < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        protocol = pickle.HIGHEST_PROTOCOL
+        header = f"{'page':<22} {'plain':>9} {'packed':>9} {'size':>6} {'plain load':>11} {'packed load':>12}"
+        self.stdout.write(header)
+        totals = [0, 0, 0.0, 0.0]
+        for name in PAGES:
+            bundle = load_page_bundle(name)
+            plain = pickle.dumps(bundle, protocol)
+            packed = pickle.dumps(pack(bundle), protocol)
+            plain_time = _load_time(plain, pickle.loads, repeat)
+            packed_time = _load_time(packed, lambda data: unpack(pickle.loads(data)), repeat)
+            totals = [
+                totals[0] + len(plain), totals[1] + len(packed),
+                totals[2] + plain_time, totals[3] + packed_time,
+            ]
+            self.stdout.write(self._row(name, len(plain), len(packed), plain_time, packed_time))
+        self.stdout.write(self._row('total', *totals))
+
+    def _row(self, name, plain_size, packed_size, plain_time, packed_time):
+        ratio = f'{packed_size / plain_size:.0%}' if plain_size else '-'
+        return (
+            f'{name:<22} {plain_size:>9,} {packed_size:>9,} {ratio:>6} '
+            f'{plain_time * 1e6:>9.0f}µs {packed_time * 1e6:>10.0f}µs'
+        )
@@ -0,0 +1,51 @@
+"""
+Pre-render public pages to static files for nginx.
+
+    python manage.py publish_pages                        # every sitemap URL
+    python manage.py publish_pages --page home --page blog_detail
+    python manage.py publish_pages --output /tmp/published
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website.publishing import publish_pages
+
+
+class Command(BaseCommand):
+    help = 'Render every sitemap URL to <PUBLISH_ROOT>/<path>/index.html (+ .gz) for nginx try_files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='',
+            help='Target directory (default: PUBLISH_ROOT setting).',
+        )
+        parser.add_argument(
+            '--page',
+            action='append',
+            dest='pages',
+            help='Only publish URLs with this URL name (repeatable), e.g. home, blog_detail.',
+        )
+
+    def handle(self, *args, **options):
+        root = options['output'] or settings.PUBLISH_ROOT
+        if not root:
+            raise CommandError('Set PUBLISH_ROOT in .env or pass --output.')
+
+        names = set(options['pages']) if options['pages'] else None
+        results = publish_pages(root=root, names=names)
+
+        failed = 0
+        for path, size in results:
+            if size is None:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'  ✗ {path}'))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'  ✓ {path} ({size} bytes)')
+
+        summary = f'Published {len(results) - failed} page(s) to {root}'
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{summary}; {failed} failed (removed, served by Django).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,34 @@
+"""
+Look up the country of contact inquiries still marked pending (website/geolocation.py).
+
+    python manage.py resolve_countries                  # every pending inquiry
+    python manage.py resolve_countries --older-than 300 --limit 100
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.geolocation import resolve_pending
+
+
+class Command(BaseCommand):
+    help = 'Resolve the country of contact inquiries whose background lookup never ran.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=0,
+            help='Only inquiries pending for at least this many seconds (default: 0, all of them).',
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Resolve at most this many inquiries.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError('--older-than must not be negative.')
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError('--limit must be at least 1.')
+        older_than = timedelta(seconds=options['older_than']) if options['older_than'] else None
+        resolved = resolve_pending(older_than=older_than, limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Resolved {resolved} pending inquiries.'))
@@ -0,0 +1,72 @@
+"""
+Fill the page cache after a deploy by fetching every sitemap URL from the running app.
+
+    python manage.py warm_cache                                  # gunicorn on 127.0.0.1:8000
+    python manage.py warm_cache --concurrency 4 --base-url http://127.0.0.1:8000
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website.publishing import sitemap_paths
+from website.warmup import fetch_paths
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Fetch every sitemap URL concurrently from the local app server and report per-URL latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://127.0.0.1:8000',
+            help='Where gunicorn listens (default: http://127.0.0.1:8000, see gunicorn_config.py).',
+        )
+        parser.add_argument(
+            '--host',
+            default=settings.PUBLISH_HOST,
+            help='Host header to send (default: PUBLISH_HOST setting).',
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel requests (default: 8).')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        paths = list(dict.fromkeys(path for _, path in sitemap_paths()))
+        results = fetch_paths(
+            paths,
+            options['base_url'],
+            options['host'],
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+        )
+
+        failed = 0
+        for path, status, seconds, note in sorted(results, key=lambda result: -result[2]):
+            line = f'  {status or "ERR":>3}  {seconds * 1000:7.0f} ms  {note:<5}  {path}'
+            if status != 200:
+                failed += 1
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+
+        timings = sorted(seconds for _, _, seconds, _ in results)
+        if not timings:
+            self.stdout.write(self.style.WARNING('No sitemap URLs to warm.'))
+            return
+        summary = (
+            f'Warmed {len(results) - failed}/{len(results)} URL(s): '
+            f'p50 {_percentile(timings, 0.5) * 1000:.0f} ms, '
+            f'p95 {_percentile(timings, 0.95) * 1000:.0f} ms, '
+            f'max {timings[-1] * 1000:.0f} ms'
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{summary}; {failed} failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
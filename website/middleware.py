@@ -3,12 +3,37 @@ HTTP security headers. Complements django.middleware.security.SecurityMiddleware
 
 Note: Browser DevTools can always view public HTML/CSS/JS — that is expected.
 These headers reduce XSS, injection, and misuse; secrets must stay server-side only.
+
+Also: per-route Cache-Control (CachePolicyMiddleware), chunk-by-chunk compression of streamed
+pages (StreamingCompressionMiddleware) and the read-only fallback while the database is
+unavailable (DatabaseUnavailableMiddleware).
 """
 
+import logging
 from urllib.parse import unquote
 
 from django.conf import settings
-from django.http import HttpResponseBadRequest
+from django.contrib import messages
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .cache_policies import policy_for
+from .compression import compress_stream, negotiate_encoding
+from .last_good import load_page
+from .page_cache import page_cache_key, serve_last_good
+
+logger = logging.getLogger(__name__)
+
+DB_UNAVAILABLE_PAGE_MESSAGE = (
+    "Our site is undergoing brief maintenance. Please try again in a minute."
+)
+DB_UNAVAILABLE_FORM_MESSAGE = (
+    "We couldn't submit your form because our site is undergoing brief maintenance. "
+    "Please submit it again in a minute."
+)
 
 
 class RejectSuspiciousPathMiddleware:
@@ -65,3 +90,93 @@ class SecurityHeadersMiddleware:
         )
 
         return response
+
+
+class CachePolicyMiddleware:
+    """Cache-Control per URL name (website/cache_policies.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        policy = policy_for(request, response)
+        if policy is not None:
+            patch_cache_control(response, **policy)
+        return response
+
+
+class StreamingCompressionMiddleware:
+    """
+    Compress streamed pages (website/streaming.py) with a flush after every chunk, so the <head>
+    reaches the browser before the rest is rendered. Must sit below GZipMiddleware, which leaves
+    responses with a Content-Encoding alone but would otherwise buffer the whole stream.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(response, 'streamed_page', False) or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        if encoding != 'identity':
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            response['Content-Encoding'] = encoding
+        return response
+
+
+class DatabaseUnavailableMiddleware:
+    """
+    Keep public pages up when a view fails with a database error (SQLite locked during a
+    migration or backup, file briefly unavailable):
+    - GET/HEAD: the page's last-known-good copy (website/last_good.py), else a 503 page;
+    - POST: back to the page with a "try again in a minute" message (JSON 503 for AJAX/JSON).
+    Every fallback carries Retry-After (DB_UNAVAILABLE_RETRY_AFTER seconds).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, DatabaseError):
+            return None
+        logger.error("Database unavailable on %s %s: %s", request.method, request.path, exception)
+        if request.method in ('GET', 'HEAD'):
+            response = self._page(request)
+        else:
+            response = self._form(request)
+        response['Retry-After'] = str(settings.DB_UNAVAILABLE_RETRY_AFTER)
+        return response
+
+    def _page(self, request):
+        entry = load_page(page_cache_key(request))
+        if entry is not None:
+            return serve_last_good(request, entry)
+        html = render_to_string('503.html', {
+            'message': DB_UNAVAILABLE_PAGE_MESSAGE,
+            'request_path': request.get_full_path(),
+        })
+        response = HttpResponse(html, status=503)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def _form(self, request):
+        wants_json = (
+            request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            or request.content_type == 'application/json'
+        )
+        if wants_json:
+            return JsonResponse(
+                {'success': False, 'message': DB_UNAVAILABLE_FORM_MESSAGE, 'error': DB_UNAVAILABLE_FORM_MESSAGE},
+                status=503,
+            )
+        # Message cookie (no session write): shown by the page's flash block, served from the cache
+        # or its last-known-good copy.
+        messages.warning(request, DB_UNAVAILABLE_FORM_MESSAGE)
+        return redirect(request.path)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0079_testimonial_marcus_sterling_photo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('origin', models.CharField(help_text='node:pid of the process that published it', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Cache Invalidation',
+                'verbose_name_plural': 'Cache Invalidations',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .query_cache import CachedQuerySet
+
 # Create your models here.
 
 class ContactInquiry(models.Model):
@@ -273,6 +275,8 @@ class CaseStudy(models.Model):
                                      help_text="Show as featured on home page")
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CachedQuerySet.as_manager()  # .cached() for read-mostly lookups
     
     class Meta:
         verbose_name = '8️⃣ Case Study'
@@ -373,6 +377,8 @@ class Partner(models.Model):
         default="",
         help_text="Homepage headline above partner logos. Only the first partner's value is used. Use {count} for dynamic number (e.g. Trusted by {count}+ Global Enterprises)."
     )
+
+    objects = CachedQuerySet.as_manager()  # .cached() for read-mostly lookups
     
     class Meta:
         verbose_name = '3️⃣ Partner Logo'
@@ -2958,3 +2964,21 @@ class AboutPageCTA(models.Model):
         if not self.pk and AboutPageCTA.objects.exists():
             return AboutPageCTA.objects.first()
         super().save(*args, **kwargs)
+
+
+# ==================== CACHE INVALIDATION BUS ====================
+
+class CacheInvalidation(models.Model):
+    """Outbox of cache invalidation events read by every app node (website/invalidation_bus.py)"""
+    kind = models.CharField(max_length=50)
+    name = models.CharField(max_length=200, blank=True)
+    origin = models.CharField(max_length=200, help_text="node:pid of the process that published it")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Cache Invalidation'
+        verbose_name_plural = 'Cache Invalidations'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.kind} {self.name} ({self.origin})"
@@ -0,0 +1,153 @@
+"""
+nginx micro-cache integration (proxy_cache in nginx/techlynxpro.conf).
+
+Pages served from the page cache are marked for nginx:
+- X-Accel-Expires: how long nginx may keep the response (stale copies get 0 and are not kept);
+- Surrogate-Key: what the page is built from ("page:<url name>" and "model:<model>" per model it
+  reads, or "content" for pages on the site-wide version). nginx hides it from visitors.
+
+Every such URL is also recorded in an index per page, with the time nginx's copy expires, so a
+content save can purge exactly the URLs nginx may still hold for the affected pages. Only paths
+are indexed: responses to URLs with a query string (utm_* links, made-up parameters) are marked
+not to be stored by nginx, which keeps each index as small as the site's list of pages; it is
+capped at MAX_INDEXED_URLS all the same. Stock nginx has no purge command; instead the URL is
+requested through the loopback refresh server (NGINX_CACHE_PURGE_URL), which bypasses the cache
+lookup and stores the freshly rendered response over the old entry — once per encoding, since
+the encoding is part of nginx's cache key.
+
+In gunicorn workers the refresh requests run in a background thread, so an admin save doesn't
+wait for them (gunicorn_config.py calls start_background_purges()). Everywhere else — manage.py
+migrate, publish and data scripts — they run inline: a daemon thread would die with the command.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .content_bundles import is_registered, page_models
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+# Sent by the nginx refresh server only (stripped from visitor requests): never answer it stale.
+REFRESH_META_KEY = 'HTTP_X_PAGE_CACHE_REFRESH'
+CONTENT_GROUP = 'content'
+INDEX_PREFIX = 'website:nginx_urls'
+# Must match the $page_encoding values in nginx/techlynxpro.conf.
+CACHED_ENCODINGS = ('br', 'gzip', 'identity')
+PURGE_REQUEST_TIMEOUT = 10
+# URLs per index; beyond that the ones whose nginx copy expires first are dropped.
+MAX_INDEXED_URLS = 1000
+
+_background = False
+
+
+def start_background_purges():
+    """Refresh purged URLs in a thread from now on (long-running server processes only)."""
+    global _background
+    _background = True
+
+
+def cache_group(url_name):
+    """Index group of a page: its URL name if registered, else the site-wide 'content' group."""
+    return url_name if is_registered(url_name) else CONTENT_GROUP
+
+
+def surrogate_keys(url_name):
+    if not is_registered(url_name):
+        return [CONTENT_GROUP]
+    models = sorted(model._meta.model_name for model in page_models(url_name))
+    return [f'page:{url_name}'] + [f'model:{name}' for name in models]
+
+
+def is_refresh_request(request):
+    return request.META.get(REFRESH_META_KEY) == '1'
+
+
+def _index_key(group):
+    return f'{INDEX_PREFIX}:{group}'
+
+
+def _live_urls(index, now):
+    """{(host, path): expiry} of an index, without the URLs nginx no longer holds."""
+    if not isinstance(index, dict):
+        return {}
+    return {url: expires for url, expires in index.items() if expires > now}
+
+
+def _record_url(group, host, path, timeout):
+    """Note that nginx may hold (host, path) for the next `timeout` seconds."""
+    key = _index_key(group)
+    now = time.time()
+    urls = _live_urls(cache.get(key), now)
+    if urls.get((host, path), 0) >= now + timeout / 2:
+        return  # recorded recently enough: skip the write
+    urls[(host, path)] = now + timeout
+    if len(urls) > MAX_INDEXED_URLS:
+        urls = dict(sorted(urls.items(), key=lambda item: item[1])[-MAX_INDEXED_URLS:])
+    # Read-modify-write: a URL lost to a concurrent update stays stale for one timeout at most.
+    cache.set(key, urls, timeout)
+
+
+def mark_response(request, response, path, stale=False):
+    """Add the nginx cache headers to a page cache response and index its path."""
+    timeout = settings.NGINX_CACHE_TIMEOUT
+    if timeout <= 0:
+        return response
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.url_name if match else None
+    response[SURROGATE_KEY_HEADER] = ' '.join(surrogate_keys(url_name))
+    # The query string is part of nginx's key (tracking parameters too): such URLs aren't stored.
+    stored = not stale and not request.META.get('QUERY_STRING')
+    response['X-Accel-Expires'] = str(timeout) if stored else '0'
+    if stored and settings.NGINX_CACHE_PURGE_URL:
+        _record_url(cache_group(url_name), request.get_host(), path, timeout)
+    return response
+
+
+def _refresh_urls(urls):
+    base = settings.NGINX_CACHE_PURGE_URL.rstrip('/')
+    for host, path in sorted(urls):
+        for encoding in CACHED_ENCODINGS:
+            try:
+                response = requests.get(
+                    base + path,
+                    headers={'Host': host, 'Accept-Encoding': encoding},
+                    timeout=PURGE_REQUEST_TIMEOUT,
+                    allow_redirects=False,
+                )
+            except requests.RequestException as exc:
+                logger.warning("nginx purge: %s%s failed: %s", host, path, exc)
+                break
+            if response.status_code != 200:
+                logger.warning("nginx purge: %s%s returned %s", host, path, response.status_code)
+                break
+
+
+def purge_pages(names, include_content=True):
+    """
+    Refresh every nginx-cached URL of the given pages (and site-wide pages).
+
+    Returns the background thread doing it, or None when it ran inline or there was nothing to do.
+    """
+    if not settings.NGINX_CACHE_PURGE_URL:
+        return None
+    groups = set(names)
+    if include_content:
+        groups.add(CONTENT_GROUP)
+    now = time.time()
+    urls = set()
+    for index in cache.get_many([_index_key(group) for group in groups]).values():
+        urls |= set(_live_urls(index, now))  # expired copies are gone from nginx already
+    if not urls:
+        return None
+    if not _background:
+        _refresh_urls(urls)
+        return None
+    thread = threading.Thread(target=_refresh_urls, args=(urls,), name='nginx-purge', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,472 @@
+"""
+Full-page cache for public GET views.
+
+Rendered HTML is stored per absolute URL (minus utm_*/gclid/… tracking parameters) under the
+current content version. Pages registered in website/content_bundles.py use their own page
+version (bumped only when one of their models changes); any other page uses the site-wide
+version, bumped on every content edit (see website/signals.py). A cached page is never served after the data behind it changed.
+
+Code changes retire cached pages too: the version a page is served under is never older than
+CODE_VERSION, the newest mtime of the project's templates and of this app's Python modules,
+taken once when the process starts. After a deploy the new workers (and manage.py commands such
+as publish_pages) run at a newer version than anything the old workers stored, even copies the
+old workers stored between migrate and their restart.
+
+Per-visitor bits are kept out of the stored copy:
+- CSRF inputs are stored empty and filled from /api/csrf/ by base.html once the visitor focuses
+  or submits a form, so every visitor gets the same bytes;
+- flash messages are rendered in {% flash_messages %} blocks, stored empty and re-rendered into
+  the cached HTML for a visitor who has some (website/templatetags/flash_messages.py);
+- logged-in users bypass the cache entirely.
+
+Since the stored bytes are shared, they are compressed once when the page is cached (gzip, plus
+Brotli if installed; website/compression.py) and the variant is picked from Accept-Encoding on
+each hit, instead of GZipMiddleware compressing the same HTML again for every request.
+
+Stale-while-revalidate: a view decorated with stale=N keeps serving its previous copy for up to N
+seconds after it expired or was invalidated, while one background thread re-renders the page and
+swaps it in. Visitors after an admin publish then never wait on a render (or on a cold worker's
+template compilation); the edit shows up as soon as the refresh lands.
+
+Single flight: filling an entry (a miss or a background refresh) takes a cross-process lock file
+(website/locks.py). Other workers missing on the same URL meanwhile wait up to
+PAGE_CACHE_FILL_WAIT seconds for that render and reuse it, instead of every worker rendering the
+same page at once after a flush or an edit.
+
+Responses also carry the headers nginx's micro-cache keys on (website/nginx_cache.py).
+
+Streamed pages (website/streaming.py) go to the visitor chunk by chunk on a miss and are stored
+once the last chunk has been sent; refresh renders (background thread, nginx) are buffered.
+
+Every stored page without a query string is also written to disk as the URL's last-known-good
+copy (website/last_good.py), served by DatabaseUnavailableMiddleware if a later render fails on
+the database.
+
+Versions are nanosecond timestamps of the last invalidation, so they double as HTTP validators:
+every cached page carries a weak ETag and a Last-Modified header derived from its version, and
+If-None-Match / If-Modified-Since get a 304 without a cache read or a render.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date
+
+from . import internal_requests
+from .compression import compress_variants, negotiate_encoding
+from .content_bundles import get_page_version, is_registered
+from .last_good import save_page
+from .locks import FileLock
+from .nginx_cache import is_refresh_request, mark_response
+from .templatetags.flash_messages import fill_flash_blocks, strip_flash_blocks
+
+logger = logging.getLogger(__name__)
+
+CONTENT_VERSION_KEY = 'website:content_version'
+PAGE_KEY_PREFIX = 'website:page'
+
+_CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+# Ad/analytics parameters: only client-side scripts read them (e.g. the contact form's UTM fields),
+# so every ad-click variant of a URL shares one cached copy. Keep in sync with nginx/techlynxpro.conf.
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset({
+    'gclid', 'gbraid', 'wbraid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'ttclid', 'twclid',
+    'igshid', 'li_fat_id', 'mc_cid', 'mc_eid', '_ga', '_gl',
+})
+
+# Response headers worth replaying on a hit; cookies/Vary are always set per request by middleware.
+_STORED_HEADERS = ('Content-Type', 'Content-Language', 'X-Robots-Tag')
+
+# Upper bound on how long a fill lock may be held (gunicorn's request timeout).
+FILL_LOCK_TIMEOUT = 30
+_FILL_POLL_INTERVAL = 0.05
+
+# Set in a refresh thread: the decorator then re-renders and stores instead of reading the cache.
+_refresh_state = threading.local()
+
+
+def code_version():
+    """Newest mtime (ns) of the template files and of this app's Python modules."""
+    roots = [Path(directory) for engine in settings.TEMPLATES for directory in engine.get('DIRS', ())]
+    roots.append(Path(__file__).resolve().parent)
+    newest = 0
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.html', '.txt', '.xml', '.py')):
+                    try:
+                        newest = max(newest, os.stat(os.path.join(dirpath, filename)).st_mtime_ns)
+                    except FileNotFoundError:
+                        continue
+    return newest
+
+
+# The code this process renders with (templates are compiled once by the cached loader).
+CODE_VERSION = code_version()
+
+
+def get_content_version():
+    """Current site-wide content version (set once, then bumped on every content change)."""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted/flushed version key can never resurrect old pages.
+        cache.add(CONTENT_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    """Invalidate every cached page by moving to a new content version."""
+    cache.set(CONTENT_VERSION_KEY, time.time_ns(), None)
+
+
+def get_request_version(request):
+    """
+    Content version the request's page depends on (per-page if registered, else site-wide),
+    raised to CODE_VERSION when the code is newer.
+    """
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.url_name if match else None
+    if is_registered(url_name):
+        return max(get_page_version(url_name), CODE_VERSION)
+    return max(get_content_version(), CODE_VERSION)
+
+
+def is_tracking_param(name):
+    return name.startswith(TRACKING_PARAM_PREFIXES) or name in TRACKING_PARAMS
+
+
+def cache_path(request):
+    """Path + query string with ad/analytics tracking parameters removed (order kept)."""
+    query = [
+        (name, value)
+        for name, value in parse_qsl(request.META.get('QUERY_STRING', ''), keep_blank_values=True)
+        if not is_tracking_param(name)
+    ]
+    path = escape_uri_path(request.path)
+    return f'{path}?{urlencode(query)}' if query else path
+
+
+def page_cache_key(request):
+    """Cache key for this request's URL (scheme + host + path + non-tracking query)."""
+    url = request.build_absolute_uri(cache_path(request))
+    url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'{PAGE_KEY_PREFIX}:{url_hash}'
+
+
+def page_etag(version):
+    """Weak ETag for a content version (weak: the same page is served in several encodings)."""
+    return f'W/"{version:x}"'
+
+
+def page_last_modified(version):
+    """Last-Modified timestamp (seconds) for a content version."""
+    return version // 1_000_000_000
+
+
+def _set_validators(response, version):
+    response['ETag'] = page_etag(version)
+    response['Last-Modified'] = http_date(page_last_modified(version))
+    return response
+
+
+def _is_cacheable_request(request):
+    if not getattr(settings, 'PAGE_CACHE_ENABLED', False):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return False
+    return True
+
+
+def _has_pending_messages(request):
+    return len(get_messages(request)) > 0
+
+
+def _is_streamed_page(response):
+    return getattr(response, 'streamed_page', False)
+
+
+def _is_cacheable_response(response):
+    if response.status_code != 200 or (response.streaming and not _is_streamed_page(response)):
+        return False
+    if response.cookies:
+        return False
+    cache_control = response.get('Cache-Control', '')
+    if 'private' in cache_control or 'no-store' in cache_control:
+        return False
+    content_type = (response.get('Content-Type') or '').split(';')[0].strip().lower()
+    return content_type == 'text/html'
+
+
+def strip_csrf_tokens(html, replacement=''):
+    """Replace the value of every csrfmiddlewaretoken input (per-visitor) with a fixed string."""
+    return _CSRF_INPUT_RE.sub(lambda m: f'{m.group(1)}{replacement}{m.group(2)}', html)
+
+
+def _entry_from_response(response, version, timeout, content=None):
+    content = response.content if content is None else content
+    html = strip_flash_blocks(strip_csrf_tokens(content.decode(response.charset)))
+    headers = {name: response[name] for name in _STORED_HEADERS if response.has_header(name)}
+    return {
+        'version': version,
+        'fresh_until': time.time() + timeout,
+        'variants': compress_variants(html.encode(response.charset)),
+        'charset': response.charset,
+        'headers': headers,
+    }
+
+
+def _entry_state(entry, version, stale):
+    """'fresh', 'stale' (servable while a refresh runs) or None (render now)."""
+    now = time.time()
+    if entry['version'] == version:
+        if now < entry['fresh_until']:
+            return 'fresh'
+        stale_since = entry['fresh_until']
+    else:
+        # Versions are invalidation timestamps: the entry went stale when the new version was set.
+        stale_since = min(entry['fresh_until'], version / 1_000_000_000)
+    if now < stale_since + stale:
+        return 'stale'
+    return None
+
+
+def _response_from_entry(request, entry):
+    variants = entry['variants']
+    encoding = negotiate_encoding(request, variants)
+    response = HttpResponse(variants[encoding])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    if encoding != 'identity':
+        # GZipMiddleware leaves responses that already have a Content-Encoding alone.
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(variants[encoding]))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _serve_entry(request, entry, status):
+    """Response for a stored entry, marked HIT / STALE / MISS for the logs and for nginx."""
+    response = _response_from_entry(request, entry)
+    response['X-Page-Cache'] = status
+    _set_validators(response, entry['version'])
+    return mark_response(request, response, cache_path(request), stale=status == 'STALE')
+
+
+def _serve_with_messages(request, entry, status):
+    """Cached page with this visitor's flash messages rendered into it (never shared further)."""
+    html = entry['variants']['identity'].decode(entry['charset'])
+    response = HttpResponse(fill_flash_blocks(html, request))
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['X-Page-Cache'] = status
+    patch_cache_control(response, private=True)
+    return response
+
+
+def _buffered(response):
+    """A streamed page as a regular response (for renders that are stored, not watched)."""
+    buffered = HttpResponse(b''.join(response.streaming_content), status=response.status_code)
+    for name, value in response.items():
+        if name != 'X-Accel-Buffering':
+            buffered[name] = value
+    return buffered
+
+
+def _keeps_last_good(request):
+    """Only canonical URLs get a last-known-good copy: query strings are unbounded."""
+    return '?' not in cache_path(request)
+
+
+def _store_when_streamed(response, key, version, timeout, stale_window, lock, last_good):
+    """Pass a streamed page through to the visitor, then store it; releases the fill lock."""
+    content = response.streaming_content
+
+    def stream():
+        chunks = []
+        try:
+            for chunk in content:
+                chunks.append(chunk)
+                yield chunk
+            entry = _entry_from_response(response, version, timeout, content=b''.join(chunks))
+            cache.set(key, entry, timeout + stale_window)
+            if last_good:
+                save_page(key, entry)
+        finally:
+            if lock is not None:
+                lock.release()
+
+    response.streaming_content = stream()
+    response['X-Page-Cache'] = 'MISS'
+    return _set_validators(response, version)
+
+
+def _fill_lock(key):
+    return FileLock(f'{key}:fill', timeout=FILL_LOCK_TIMEOUT)
+
+
+def _wait_for_fill(key, version, lock):
+    """Entry stored at this version by the lock holder, or None if it did not arrive in time."""
+    deadline = time.monotonic() + settings.PAGE_CACHE_FILL_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(_FILL_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry
+        if not lock.locked():
+            # Holder finished without storing (uncacheable response, error) — render ourselves.
+            return None
+    return None
+
+
+def _refresh_page(lock, host, secure, path):
+    """Re-render one page through the full middleware stack and store it (runs in a thread)."""
+    _refresh_state.active = True
+    try:
+        # In process, as nginx would forward it (a plain secure=True request meets SECURE_SSL_REDIRECT).
+        response = internal_requests.get(host, path, secure)
+        response.close()
+        if response.status_code != 200:
+            logger.warning("Page cache: refreshing %s returned %s", path, response.status_code)
+    except Exception:
+        logger.exception("Page cache: refreshing %s failed", path)
+    finally:
+        _refresh_state.active = False
+        lock.release()
+        connections.close_all()
+
+
+def _schedule_refresh(request, key):
+    lock = _fill_lock(key)
+    if not lock.acquire():
+        return  # another worker/thread is already re-rendering this page
+    thread = threading.Thread(
+        target=_refresh_page,
+        args=(lock, request.get_host(), request.is_secure(), request.get_full_path()),
+        name=f'page-refresh-{key}',
+        daemon=True,
+    )
+    thread.start()
+
+
+def serve_last_good(request, entry):
+    """A page's last-known-good copy, when it can't be rendered now (never cached downstream)."""
+    try:
+        has_messages = _has_pending_messages(request)
+    except DatabaseError:
+        has_messages = False  # messages that overflowed into the session are out of reach
+    if has_messages:
+        return _serve_with_messages(request, entry, 'FALLBACK')
+    response = _serve_entry(request, entry, 'STALE')  # STALE: nginx must not store it
+    response['X-Page-Cache'] = 'FALLBACK'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_public_page(view_func=None, *, timeout=None, stale=None):
+    """
+    Cache a public view's rendered HTML per URL until the next content change.
+
+    Usage: @cache_public_page or @cache_public_page(timeout=600, stale=300).
+    timeout: seconds a copy stays fresh (default PAGE_CACHE_TIMEOUT).
+    stale: seconds an expired/invalidated copy may still be served while a background thread
+    re-renders it (default PAGE_CACHE_STALE_TIMEOUT; 0 = always render synchronously).
+    POSTs and logged-in users always run the view; pending flash messages are filled into the
+    cached page.
+    GET/HEAD responses carry ETag/Last-Modified; matching conditional requests get a 304.
+    """
+    def decorator(func):
+        @wraps(func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return func(request, *args, **kwargs)
+
+            page_timeout = timeout if timeout is not None else settings.PAGE_CACHE_TIMEOUT
+            stale_window = stale if stale is not None else settings.PAGE_CACHE_STALE_TIMEOUT
+            if is_refresh_request(request):
+                stale_window = 0  # nginx is about to store this response
+            version = get_request_version(request)
+            key = page_cache_key(request)
+            refreshing = getattr(_refresh_state, 'active', False)
+            has_messages = _has_pending_messages(request)
+            serve = _serve_with_messages if has_messages else _serve_entry
+
+            if not refreshing:
+                # A 304 would swallow pending messages.
+                if not has_messages:
+                    not_modified = get_conditional_response(
+                        request,
+                        etag=page_etag(version),
+                        last_modified=page_last_modified(version),
+                    )
+                    if not_modified is not None:
+                        return _set_validators(not_modified, version)
+
+                entry = cache.get(key)
+                state = _entry_state(entry, version, stale_window) if entry is not None else None
+                if state is not None:
+                    if state == 'stale':
+                        _schedule_refresh(request, key)
+                        return serve(request, entry, 'STALE')
+                    return serve(request, entry, 'HIT')
+
+                lock = _fill_lock(key)
+                if not lock.acquire():
+                    entry = _wait_for_fill(key, version, lock)
+                    if entry is not None:
+                        return serve(request, entry, 'HIT')
+            else:
+                lock = None  # the refresh thread already holds it
+
+            try:
+                response = func(request, *args, **kwargs)
+                if _is_streamed_page(response) and (refreshing or is_refresh_request(request)):
+                    response = _buffered(response)
+                if not _is_cacheable_response(response):
+                    return response
+                if response.streaming:
+                    # No messages here (stream_page renders those in one piece). The lock is
+                    # held until the page has been stored.
+                    lock, held = None, lock
+                    return _store_when_streamed(
+                        response, key, version, page_timeout, stale_window, held, _keeps_last_good(request),
+                    )
+                entry = _entry_from_response(response, version, page_timeout)
+                # Kept past its freshness so it can still be served stale while being refreshed.
+                cache.set(key, entry, page_timeout + stale_window)
+                if _keeps_last_good(request):
+                    save_page(key, entry)
+            finally:
+                if lock is not None:
+                    lock.release()
+            if has_messages:
+                # This render already used up the messages: send it as is (the stored copy has none).
+                response['X-Page-Cache'] = 'MISS'
+                patch_cache_control(response, private=True)
+                return response
+            # Serve the stored bytes on a miss too, so every visitor sees the same page.
+            return _serve_entry(request, entry, 'MISS')
+
+        return _wrapped_view
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
@@ -0,0 +1,188 @@
+"""
+Static pre-render ("publish") of public pages for nginx.
+
+Every URL from the static, blog and case-study sitemaps is rendered through the normal Django
+stack and written under PUBLISH_ROOT as <path>/index.html plus precompressed index.html.gz and, when the
+optional brotli package is installed, index.html.br.
+nginx serves those files with try_files before proxying to gunicorn (nginx/techlynxpro.conf).
+
+Published files carry no per-visitor data: CSRF inputs are written empty and filled from
+/api/csrf/ by base.html; visitors with flash messages or a session are sent to Django by nginx.
+A manifest (path → URL name) lets a partial re-publish drop files of URLs that disappeared
+(unpublished post, renamed slug).
+
+After an admin save the affected files are deleted right away, so nginx hands those URLs to
+Django, and re-rendered in a background thread; the save doesn't wait for the renders.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.urls import NoReverseMatch, resolve
+
+from . import internal_requests
+from .compression import compress_variants
+from .page_cache import strip_csrf_tokens
+from .sitemaps import BlogPostSitemap, CaseStudySitemap, StaticViewSitemap
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_SITEMAPS = (StaticViewSitemap, BlogPostSitemap, CaseStudySitemap)
+MANIFEST_NAME = '.manifest.json'
+# Suffix of each precompressed sibling of index.html (nginx gzip_static / brotli_static).
+_ENCODING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+# Publishing runs offline, so spend the extra CPU on Brotli's densest setting.
+PUBLISH_BROTLI_QUALITY = 11
+# One background re-publish at a time per process: each rewrites the manifest.
+_republish_lock = threading.Lock()
+
+
+def sitemap_paths():
+    """[(url_name, path)] for every URL listed in the published sitemaps."""
+    paths = []
+    for sitemap_class in PUBLISHED_SITEMAPS:
+        sitemap = sitemap_class()
+        for item in sitemap.items():
+            try:
+                path = sitemap.location(item)
+            except NoReverseMatch:
+                # e.g. a case study saved without a slug — not linkable, so nothing to publish.
+                logger.warning("Publish: skipping %r (no URL)", item)
+                continue
+            paths.append((resolve(path).url_name, path))
+    return paths
+
+
+def render_path(path):
+    """Rendered HTML for a public path with per-visitor tokens removed, or None if not a 200."""
+    # Forwarded as https like nginx does: otherwise SECURE_SSL_REDIRECT answers 301 with DEBUG off.
+    response = internal_requests.get(settings.PUBLISH_HOST, path, secure=not settings.DEBUG)
+    try:
+        if response.status_code != 200:
+            logger.warning("Publish: %s returned %s", path, response.status_code)
+            return None
+        content = internal_requests.response_content(response)  # streamed pages too
+    finally:
+        response.close()
+    return strip_csrf_tokens(content.decode(response.charset), replacement='')
+
+
+def _target_dir(root, path):
+    return Path(root) / path.strip('/')
+
+
+def _atomic_write(target, data):
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.publish-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # readable by the nginx user
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_page(root, path, html):
+    target_dir = _target_dir(root, path)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    variants = compress_variants(html.encode('utf-8'), brotli_quality=PUBLISH_BROTLI_QUALITY)
+    # Compressed siblings first: index.html is what makes nginx serve the page at all.
+    for encoding, suffix in _ENCODING_SUFFIXES.items():
+        if encoding in variants:
+            _atomic_write(target_dir / f'index.html{suffix}', variants[encoding])
+        else:
+            (target_dir / f'index.html{suffix}').unlink(missing_ok=True)
+    _atomic_write(target_dir / 'index.html', variants['identity'])
+
+
+def remove_page(root, path):
+    target_dir = _target_dir(root, path)
+    for name in ('index.html', *(f'index.html{suffix}' for suffix in _ENCODING_SUFFIXES.values())):
+        (target_dir / name).unlink(missing_ok=True)
+
+
+def _read_manifest(root):
+    try:
+        with open(Path(root) / MANIFEST_NAME, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(root, manifest):
+    _atomic_write(Path(root) / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def publish_pages(root=None, names=None):
+    """
+    Render sitemap URLs to files under root (default PUBLISH_ROOT).
+
+    names: only URLs whose URL name is in this collection (None = everything).
+    Returns [(path, bytes written or None on failure)].
+    """
+    root = root or settings.PUBLISH_ROOT
+    Path(root).mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(root)
+
+    results = []
+    published = {}
+    for url_name, path in sitemap_paths():
+        if names is not None and url_name not in names:
+            continue
+        try:
+            html = render_path(path)
+        except Exception:
+            logger.exception("Publish: rendering %s failed", path)
+            html = None
+        if html is None:
+            # Never leave an outdated copy in front of Django.
+            remove_page(root, path)
+            results.append((path, None))
+            continue
+        write_page(root, path, html)
+        published[path] = url_name
+        results.append((path, len(html.encode('utf-8'))))
+
+    for path, url_name in list(manifest.items()):
+        if (names is None or url_name in names) and path not in published:
+            remove_page(root, path)
+            del manifest[path]
+    manifest.update(published)
+    _write_manifest(root, manifest)
+    return results
+
+
+def _remove_pages(root, names):
+    for path, url_name in _read_manifest(root).items():
+        if url_name in names:
+            remove_page(root, path)
+
+
+def _republish(names):
+    try:
+        with _republish_lock:
+            publish_pages(names=names)
+    except Exception:
+        # Files not rewritten stay deleted: nginx keeps proxying those URLs to Django.
+        logger.exception("Publish: re-rendering %s failed", ', '.join(sorted(names)))
+    finally:
+        connections.close_all()
+
+
+def republish_pages(names):
+    """
+    Drop the published files of the given pages now and re-render them in a background thread
+    (called from website/signals.py after a content change). Returns the thread.
+    """
+    names = set(names)
+    _remove_pages(settings.PUBLISH_ROOT, names)
+    thread = threading.Thread(target=_republish, args=(names,), name='publish', daemon=True)
+    thread.start()
+    return thread
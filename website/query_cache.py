@@ -0,0 +1,156 @@
+"""
+Opt-in ORM result cache for read-mostly lookups.
+
+    class Partner(models.Model):
+        objects = CachedQuerySet.as_manager()
+
+    Partner.objects.order_by('order').cached().first()
+
+A .cached() queryset stores its rows (or count() / exists() result) in the shared cache under
+its compiled SQL plus the current version of every table the query reads, including the tables
+of its subqueries (Subquery, Exists, __in=queryset). Saving or deleting any row of a table bumps
+that table's version (website/signals.py), so results are never served after their data changed
+and no call site needs its own invalidation. RawSQL names no table: keep it out of cached queries.
+
+Table versions are only bumped by model signals: queryset .update() / bulk_create() and raw SQL
+bypass them, so don't use .cached() on tables written that way. prefetch_related() lookups run
+uncached on top of the cached rows. Model rows are stored packed (website/compact.py).
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import models
+from django.db.models.sql import Query
+
+from .compact import pack, unpack
+
+TABLE_VERSION_PREFIX = 'website:table_version'
+QUERY_PREFIX = 'website:query'
+DEFAULT_TIMEOUT = 60 * 60
+
+_MISSING = object()
+
+
+def _table_version_key(table):
+    return f'{TABLE_VERSION_PREFIX}:{table}'
+
+
+def bump_table_version(table):
+    cache.set(_table_version_key(table), time.time_ns(), None)
+
+
+def get_table_versions(tables):
+    keys = [_table_version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _nested_queries(node):
+    """Query objects inside a WHERE tree or expression: Subquery, Exists, __in=queryset…"""
+    if isinstance(node, Query):
+        yield node
+        return
+    if isinstance(node, models.QuerySet):
+        yield node.query
+        return
+    children = getattr(node, 'children', None)  # WhereNode
+    if children is None:
+        children = node.get_source_expressions() if hasattr(node, 'get_source_expressions') else ()
+        # Lookups with a direct value leave rhs out of their source expressions.
+        rhs = getattr(node, 'rhs', None)
+        if isinstance(rhs, (Query, models.QuerySet)):
+            children = [*children, rhs]
+    for child in children:
+        if child is not None:
+            yield from _nested_queries(child)
+
+
+def _query_tables(query, tables):
+    """Add every table a query reads, its subqueries' included, to tables."""
+    if query.model is not None:
+        tables.add(query.model._meta.db_table)
+    tables.update(join.table_name for join in query.alias_map.values())
+    expressions = [query.where, *query.annotations.values(), *query.select]
+    expressions += [field for field in query.order_by if hasattr(field, 'resolve_expression')]
+    for expression in expressions:
+        for nested in _nested_queries(expression):
+            _query_tables(nested, tables)
+    for combined in query.combined_queries:  # union() / intersection() / difference()
+        _query_tables(combined, tables)
+
+
+def compile_queryset(queryset):
+    """(sql, params, sorted tables read) of a queryset without running it; None if always empty."""
+    query = queryset.query.clone()
+    try:
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    # Compiling set up the joins: every table the outer query reads is in the alias map now.
+    # Subqueries keep their own tables.
+    tables = set()
+    _query_tables(query, tables)
+    return sql, params, sorted(tables)
+
+
+class CachedQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_timeout = None  # None: not cached
+
+    def cached(self, timeout=DEFAULT_TIMEOUT):
+        """This queryset, with its results served from the shared cache while its tables are unchanged."""
+        clone = self._chain()
+        clone._cache_timeout = timeout
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._cache_timeout = self._cache_timeout
+        return clone
+
+    def _cache_key(self, operation):
+        """Key for this query's result, or None if the query can't be compiled (always empty)."""
+        compiled = compile_queryset(self)
+        if compiled is None:
+            return None
+        sql, params, tables = compiled
+        versions = get_table_versions(tables)
+        signature = '\n'.join([
+            self.db, operation, self._iterable_class.__name__, sql, repr(params),
+            repr(list(zip(tables, versions))),
+        ])
+        return f'{QUERY_PREFIX}:{hashlib.md5(signature.encode("utf-8")).hexdigest()}'
+
+    def _cached_result(self, operation, compute):
+        key = self._cache_key(operation)
+        if key is None:
+            return compute()
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = compute()
+            cache.set(key, pack(result), self._cache_timeout)
+            return result
+        return unpack(result, self.db)
+
+    def _fetch_all(self):
+        if self._cache_timeout is not None and self._result_cache is None:
+            self._result_cache = self._cached_result('rows', lambda: list(self._iterable_class(self)))
+        super()._fetch_all()
+
+    def count(self):
+        if self._cache_timeout is not None and self._result_cache is None:
+            return self._cached_result('count', super().count)
+        return super().count()
+
+    def exists(self):
+        if self._cache_timeout is not None and self._result_cache is None:
+            return self._cached_result('exists', super().exists)
+        return super().exists()
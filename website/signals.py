@@ -0,0 +1,143 @@
+"""
+Cache invalidation hooks.
+
+Any save/delete of a website content model (i.e. an admin edit) invalidates, once the
+transaction commits:
+- the bundles/HTML of registered pages that read that model (website/content_bundles.py);
+- the site-wide content version used by every other cached page;
+- the pre-rendered files of the affected pages, when publishing is enabled (website/publishing.py);
+- nginx's micro-cache copies of those pages, when a purge URL is set (website/nginx_cache.py);
+- every worker's in-memory copy of the model's singleton rows (website/singletons.py).
+
+Any model save/delete (content or not) also bumps the version of its table(s), which retires
+.cached() query results that read them (website/query_cache.py).
+
+Both are local to this host, so every change to a content model is also published on the
+invalidation bus (website/invalidation_bus.py); the other nodes run the same invalidation when
+they receive it. Saves of anything else (inquiries, sessions, users, the outbox itself) are not
+broadcast: no other node caches them.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import invalidation_bus
+from .content_bundles import invalidate_pages, pages_for_model, registered_pages
+from .nginx_cache import purge_pages
+from .page_cache import bump_content_version
+from .query_cache import bump_table_version
+from .singletons import bump_singleton_version
+
+# Visitor submissions are never rendered on public pages — saving them must not flush the cache.
+NON_CONTENT_MODELS = {'contactinquiry', 'newsletter', 'careerapplication', 'cacheinvalidation'}
+
+
+def is_content_model(model):
+    """True for website models whose rows end up in public page HTML."""
+    meta = model._meta
+    return meta.app_label == 'website' and meta.model_name not in NON_CONTENT_MODELS
+
+
+def _invalidate_for_model(model):
+    bump_singleton_version(model)
+    pages = pages_for_model(model)
+    invalidate_pages(pages)
+    bump_content_version()
+    if settings.PUBLISH_ROOT and pages:
+        from .publishing import republish_pages
+        republish_pages(pages)
+    purge_pages(pages)
+
+
+@receiver(post_save, dispatch_uid='website_page_cache_post_save')
+@receiver(post_delete, dispatch_uid='website_page_cache_post_delete')
+def invalidate_page_cache(sender, **kwargs):
+    if is_content_model(sender):
+        # After commit: a worker rebuilding in between would otherwise cache pre-edit rows
+        # under the new version.
+        transaction.on_commit(partial(_invalidate_for_model, sender))
+
+
+def _bump_tables(model):
+    for table_model in [model, *model._meta.get_parent_list()]:
+        bump_table_version(table_model._meta.db_table)
+
+
+@receiver(post_save, dispatch_uid='website_query_cache_post_save')
+@receiver(post_delete, dispatch_uid='website_query_cache_post_delete')
+def invalidate_query_cache(sender, **kwargs):
+    if sender._meta.model_name != 'cacheinvalidation':
+        transaction.on_commit(partial(_bump_tables, sender))
+
+
+@receiver(m2m_changed, dispatch_uid='website_query_cache_m2m_changed')
+def invalidate_query_cache_m2m(sender, action, **kwargs):
+    # sender is the through model; only its table changes.
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(partial(_bump_tables, sender))
+
+
+def _invalidate_everything():
+    for model in apps.get_app_config('website').get_models(include_auto_created=True):
+        bump_singleton_version(model)
+        bump_table_version(model._meta.db_table)
+    invalidate_pages(registered_pages())
+    bump_content_version()
+    purge_pages(registered_pages())
+
+
+def _has_outbox_table(using):
+    from .models import CacheInvalidation
+    return CacheInvalidation._meta.db_table in connections[using].introspection.table_names()
+
+
+@receiver(post_migrate, dispatch_uid='website_page_cache_post_migrate')
+def invalidate_after_migrate(sender, using, plan=None, **kwargs):
+    # Data migrations use .update()/bulk_create, which skip post_save.
+    if sender.label == 'website':
+        _invalidate_everything()
+        # Only when migrations ran, and not before the outbox table exists (migrating to an
+        # older state, or `flush`, which sends post_migrate too).
+        if plan and _has_outbox_table(using):
+            invalidation_bus.publish('all')
+
+
+# ==================== INVALIDATION BUS ====================
+
+def _is_broadcast(model):
+    # Content models only (the outbox table is one of the non-content ones). Historical models
+    # (migrations) are covered by the post_migrate 'all' event.
+    return model._meta.apps is apps and is_content_model(model)
+
+
+@receiver(post_save, dispatch_uid='website_bus_post_save')
+@receiver(post_delete, dispatch_uid='website_bus_post_delete')
+def broadcast_change(sender, **kwargs):
+    if _is_broadcast(sender):
+        invalidation_bus.publish('model', sender._meta.label)
+
+
+@receiver(m2m_changed, dispatch_uid='website_bus_m2m_changed')
+def broadcast_m2m_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and _is_broadcast(sender):
+        invalidation_bus.publish('model', sender._meta.label)
+
+
+def apply_remote_change(label):
+    """Invalidate this node's caches for a model saved/deleted on another node."""
+    try:
+        model = apps.get_model(label)
+    except LookupError:
+        return  # model not known to this node's code (deploy in progress)
+    _bump_tables(model)
+    if is_content_model(model):
+        _invalidate_for_model(model)
+
+
+invalidation_bus.subscribe('model', apply_remote_change)
+invalidation_bus.subscribe('all', lambda name: _invalidate_everything())
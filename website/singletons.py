@@ -0,0 +1,55 @@
+"""
+Process-local cache for singleton rows (page heroes, CTAs, SEO blocks, policy pages).
+
+These tables hold one (active) row and change a few times a year, yet every render used to
+fetch them. get_singleton() keeps the row in this worker's memory and checks one shared version
+stamp per model (a cache read, no SQL) before reusing it; website/signals.py bumps the stamp
+when the model is saved or deleted, so every worker refetches on its next access.
+
+The same instance is handed to every request of the process — treat it as read-only.
+"""
+
+import time
+from typing import Optional, TypeVar
+
+from django.core.cache import cache
+from django.db import models
+
+M = TypeVar('M', bound=models.Model)
+
+VERSION_PREFIX = 'website:singleton_version'
+
+# (model label, filters) → (version, instance or None)
+_instances = {}
+
+
+def _version_key(model):
+    return f'{VERSION_PREFIX}:{model._meta.label_lower}'
+
+
+def get_singleton_version(model):
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_singleton_version(model):
+    """Make every worker refetch this model's singletons (called after a save/delete commits)."""
+    cache.set(_version_key(model._meta.concrete_model), time.time_ns(), None)
+
+
+def get_singleton(model: type[M], **filters) -> Optional[M]:
+    """model.objects.filter(**filters).first(), served from process memory while unchanged."""
+    model = model._meta.concrete_model
+    key = (model._meta.label_lower, tuple(sorted(filters.items())))
+    # Read the version before the query: an edit committing meanwhile leaves this copy outdated.
+    version = get_singleton_version(model)
+    cached = _instances.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    instance = model.objects.filter(**filters).first()
+    _instances[key] = (version, instance)
+    return instance
@@ -0,0 +1,146 @@
+"""
+Streaming render for pages on the base layout: the <head> goes out before the body has rendered.
+
+    return stream_page(request, 'website/index.html', _home_context())
+
+The page's queries run first, before the response is returned: stream_page() evaluates every
+queryset in the context, so a DatabaseError is raised by the view as with render() and
+DatabaseUnavailableMiddleware can still answer with the last-known-good copy. Once the first
+chunk is out the status can't change any more, so the context must hold everything the body
+reads (prefetch the relations it follows): the render itself must not need the database.
+
+The template is then rendered node by node (base.html's top-level nodes and, inside blocks, each
+node of the page's block) and sent in chunks: first everything up to </head>, so the browser
+fetches app.min.css, the fonts and the page's preload hints while the body is still rendering,
+then each section as soon as it has rendered. Only the home page streams: it has the longest
+body of the site.
+
+Rendered in one piece instead (like render()) when PAGE_STREAMING_ENABLED is False or the visitor
+has flash messages: those must be marked as read before the response leaves MessageMiddleware.
+CSRF inputs are sent empty, as on cached pages, and base.html fills them from /api/csrf/. Once
+the headers are out the CSRF cookie can't be set any more.
+
+The page cache stores a streamed page once the last chunk has gone out (website/page_cache.py).
+StreamingCompressionMiddleware compresses the chunks with a flush after each one, because
+GZipMiddleware would hold them back until its buffer fills. Responses are marked
+X-Accel-Buffering: no so that nginx passes each chunk on at once.
+"""
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.base import TextNode
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockContext, BlockNode, ExtendsNode
+
+from .page_cache import strip_csrf_tokens
+
+HEAD_END = '</head>'
+
+
+def _render_extends(node, context):
+    """ExtendsNode.render, one parent node at a time."""
+    parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for parent_node in parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                # The parent is the root template: its own blocks are the last fallback.
+                block_context.add_blocks(
+                    {block.name: block for block in parent.nodelist.get_nodes_by_type(BlockNode)}
+                )
+            break
+    with context.render_context.push_state(parent, isolated_context=False):
+        yield from _render_nodes(parent.nodelist, context)
+
+
+def _render_block(node, context):
+    """BlockNode.render, one node of the overriding block at a time."""
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from _render_nodes(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from _render_nodes(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def _render_nodes(nodelist, context):
+    """(html, is_text) for each rendered node, descending into {% extends %} and {% block %}."""
+    for node in nodelist:
+        if isinstance(node, ExtendsNode):
+            yield from _render_extends(node, context)
+        elif isinstance(node, BlockNode):
+            yield from _render_block(node, context)
+        else:
+            yield node.render_annotated(context), isinstance(node, TextNode)
+
+
+def _render_chunks(request, template_name, context):
+    """The page as HTML chunks: up to </head>, then one per rendered node (text is merged in)."""
+    backend_template = get_template(template_name)
+    template = backend_template.template
+    page_context = make_context(context, request, autoescape=template.engine.autoescape)
+    head_sent = False
+    pending = []
+    with page_context.render_context.push_state(template):
+        with page_context.bind_template(template):
+            page_context.template_name = template.name
+            for html, is_text in _render_nodes(template.nodelist, page_context):
+                pending.append(html)
+                if head_sent and is_text:
+                    continue  # static text costs nothing: send it with the next rendered node
+                if not head_sent and HEAD_END not in html:
+                    continue
+                yield strip_csrf_tokens(''.join(pending))
+                pending = []
+                head_sent = True
+    if pending:
+        yield strip_csrf_tokens(''.join(pending))
+
+
+def _run_queries(context):
+    for value in context.values():
+        if isinstance(value, QuerySet):
+            len(value)  # evaluated now; the template iterates the fetched rows
+
+
+def stream_page(request, template_name, context=None):
+    """
+    Render a page on the base layout as a streaming response, <head> first.
+
+    The context's querysets are evaluated before the response is returned (see above).
+    """
+    context = dict(context or {})
+    if not settings.PAGE_STREAMING_ENABLED or len(get_messages(request)) > 0:
+        return render(request, template_name, context)
+
+    _run_queries(context)
+    chunks = _render_chunks(request, template_name, context)
+    head = next(chunks)
+
+    def stream():
+        try:
+            yield head
+            yield from chunks
+        finally:
+            chunks.close()  # client gone mid-page: leave the template's render state now
+
+    response = StreamingHttpResponse(stream())
+    response.streamed_page = True
+    response['X-Accel-Buffering'] = 'no'
+    return response
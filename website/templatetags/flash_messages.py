@@ -0,0 +1,80 @@
+"""
+Hole-punched flash messages for cached pages.
+
+    {% load flash_messages %}
+    {% flash_messages %}{% if messages %}…{% endif %}{% endflash_messages %}
+
+The block renders normally, wrapped in <!--flash:KEY--> … <!--/flash:KEY--> markers. The page
+cache stores pages with every block emptied (strip_flash_blocks) and, for a visitor with pending
+messages, re-renders just these blocks into the cached HTML (fill_flash_blocks) — so pages with
+forms stay cacheable and messages never end up in a shared copy.
+
+Inside the block only `messages` and `request` are available on a cache hit.
+"""
+
+import re
+
+from django import template
+from django.contrib.messages import get_messages
+from django.template import Context
+from django.template.loader import get_template
+
+register = template.Library()
+
+# KEY ("<template name>#<n>") → node; filled when a template is compiled.
+_BLOCKS = {}
+
+_BLOCK_RE = re.compile(r'<!--flash:(?P<key>[^>]+?)-->.*?<!--/flash:(?P=key)-->', re.S)
+
+
+class FlashMessagesNode(template.Node):
+    def __init__(self, key, nodelist):
+        self.key = key
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return self.wrap(self.nodelist.render(context))
+
+    def wrap(self, content):
+        return f'<!--flash:{self.key}-->{content}<!--/flash:{self.key}-->'
+
+
+@register.tag('flash_messages')
+def do_flash_messages(parser, token):
+    nodelist = parser.parse(('endflash_messages',))
+    parser.delete_first_token()
+    # Blocks are numbered in source order, so the key is stable across compilations/workers.
+    index = getattr(parser, '_flash_block_count', 0)
+    parser._flash_block_count = index + 1
+    key = f'{parser.origin.template_name}#{index}'
+    node = FlashMessagesNode(key, nodelist)
+    _BLOCKS[key] = node
+    return node
+
+
+def strip_flash_blocks(html):
+    """HTML with the content of every flash block removed (markers kept for fill_flash_blocks)."""
+    return _BLOCK_RE.sub(lambda m: f'<!--flash:{m.group("key")}--><!--/flash:{m.group("key")}-->', html)
+
+
+def _block_node(key):
+    node = _BLOCKS.get(key)
+    if node is None:
+        # Not compiled in this process yet — loading the template registers its blocks.
+        get_template(key.rsplit('#', 1)[0])
+        node = _BLOCKS.get(key)
+    return node
+
+
+def fill_flash_blocks(html, request):
+    """Render the visitor's pending messages into the (stripped) flash blocks of a cached page."""
+    messages = get_messages(request)
+
+    def _render(match):
+        node = _block_node(match.group('key'))
+        if node is None:
+            return match.group(0)
+        context = Context({'messages': messages, 'request': request})
+        return node.wrap(node.nodelist.render(context))
+
+    return _BLOCK_RE.sub(_render, html)
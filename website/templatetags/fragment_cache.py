@@ -0,0 +1,117 @@
+"""
+Render cache for repeated template fragments, keyed by the data they display.
+
+    {% load fragment_cache %}
+    {% fragment "process steps" process_steps %}
+        {% for step in process_steps %}…{% endfor %}
+    {% endfragment %}
+
+The rendered HTML is stored under the fragment (template + position + the template file's
+mtime, so a deploy with an edited template renders afresh) plus the objects named after it:
+- a model instance: its model and pk (plus its select_related / prefetched objects);
+- a queryset: its SQL — not run on a hit;
+- a list/tuple of those; any other value by its repr (e.g. request.path).
+Every table those objects come from adds its version (website/query_cache.py), which
+website/signals.py bumps on each save/delete — so a fragment renders once per content change
+instead of once per request, also on pages the page cache can't serve (logged-in users, POST
+re-renders, refresh renders after an edit to another section of the page).
+
+Everything the fragment shows must come from those objects or be the same for every visitor.
+CSRF inputs are stored empty (base.html fills them); don't put {% flash_messages %} blocks inside.
+Off when FRAGMENT_CACHE_ENABLED is False (default in DEBUG).
+"""
+
+import hashlib
+import os
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils.safestring import mark_safe
+
+from ..page_cache import strip_csrf_tokens
+from ..query_cache import compile_queryset, get_table_versions
+
+register = template.Library()
+
+FRAGMENT_PREFIX = 'website:fragment'
+
+
+def _model_tables(model):
+    return [table_model._meta.db_table for table_model in [model, *model._meta.get_parent_list()]]
+
+
+def _describe(value, parts, tables):
+    """Append the cache signature of a vary-on value to parts and the tables it reads to tables."""
+    if isinstance(value, models.Model):
+        parts.append(f'{value._meta.label}:{value.pk!r}')
+        tables.update(_model_tables(type(value)))
+        for related in value._state.fields_cache.values():
+            if isinstance(related, models.Model):
+                _describe(related, parts, tables)
+        for prefetched in getattr(value, '_prefetched_objects_cache', {}).values():
+            if isinstance(prefetched, models.QuerySet):
+                tables.update(_model_tables(prefetched.model))
+    elif isinstance(value, models.QuerySet):
+        if value._result_cache is not None:
+            _describe(value._result_cache, parts, tables)
+            return
+        compiled = compile_queryset(value)
+        if compiled is None:
+            parts.append(f'{value.model._meta.label}:none')
+            return
+        sql, params, query_tables = compiled
+        parts.append(f'{sql}|{params!r}')
+        tables.update(query_tables)
+    elif isinstance(value, (list, tuple)):
+        parts.append(f'[{len(value)}]')
+        for item in value:
+            _describe(item, parts, tables)
+    else:
+        parts.append(repr(value))
+
+
+class FragmentNode(template.Node):
+    def __init__(self, key, vary_on, nodelist):
+        self.key = key
+        self.vary_on = vary_on
+        self.nodelist = nodelist
+
+    def cache_key(self, context):
+        parts, tables = [self.key], set()
+        for expression in self.vary_on:
+            _describe(expression.resolve(context), parts, tables)
+        tables = sorted(tables)
+        parts.append(repr(list(zip(tables, get_table_versions(tables)))))
+        signature = '\n'.join(parts)
+        return f'{FRAGMENT_PREFIX}:{hashlib.md5(signature.encode("utf-8")).hexdigest()}'
+
+    def render(self, context):
+        if not settings.FRAGMENT_CACHE_ENABLED:
+            return self.nodelist.render(context)
+        key = self.cache_key(context)
+        html = cache.get(key)
+        if html is None:
+            html = strip_csrf_tokens(self.nodelist.render(context))
+            cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+        return mark_safe(html)
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError("'fragment' tag requires a name: {% fragment \"name\" [objects…] %}")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    index = getattr(parser, '_fragment_count', 0)
+    parser._fragment_count = index + 1
+    origin = parser.origin
+    try:
+        stamp = os.path.getmtime(origin.name)
+    except (OSError, TypeError):
+        stamp = 0  # not a file (string template)
+    key = f'{origin.template_name}#{index}@{stamp}:{bits[1]}'
+    vary_on = [parser.compile_filter(bit) for bit in bits[2:]]
+    return FragmentNode(key, vary_on, nodelist)
@@ -1,3 +1,1156 @@
-from django.test import TestCase
+import gzip
+import http.server
+import io
+import ipaddress
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.db.models import Exists, OuterRef
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import (
+    content_bundles, geo_providers, geolocation, internal_requests, invalidation_bus, nginx_cache, page_cache, publishing, singletons, views,
+)
+from .cache_backends import _DIRTY_MAGIC, _HEADER, MmapCache
+from .compact import pack, unpack
+from .management.commands import backfill_countries
+from .last_good import load_page, save_page
+from .compression import accepted_encodings, negotiate_encoding
+from .geoip import RangeDatabase, write_database
+from .models import (
+    AboutPageAdvantage, AboutPageCTA, CacheInvalidation, ContactInquiry, Partner, ServiceDetail, ServiceFeature,
+)
+from .query_cache import compile_queryset
+from .streaming import stream_page
+from .warmup import compile_templates, fetch_paths
+
+
+def _temp_dir(test):
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return Path(directory.name)
+
+
+def _override(test, **settings):
+    override = override_settings(**settings)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+def _isolate_caches(test):
+    """Page cache on, with the shared cache, lock files and last-good copies in a temp dir."""
+    directory = _temp_dir(test)
+    _override(
+        test,
+        CACHES={'default': {
+            'BACKEND': 'website.cache_backends.MmapCache',
+            'LOCATION': str(directory / 'cache.mmap'),
+            'OPTIONS': {'SIZE': 4 * 1024 * 1024, 'SLOTS': 1024},
+        }},
+        PAGE_CACHE_ENABLED=True,
+        CACHE_LOCK_DIR=str(directory / 'locks'),
+        LAST_GOOD_DIR=str(directory / 'last_good'),
+        NGINX_CACHE_PURGE_URL='',
+        PUBLISH_ROOT='',
+    )
+    return directory
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_second_request_is_a_hit(self):
+        self.assertEqual(self.client.get('/about/')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/about/')['X-Page-Cache'], 'HIT')
+
+    def test_content_save_invalidates(self):
+        etag = self.client.get('/about/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            AboutPageAdvantage.objects.create(title='Support', description='-', icon='bolt')
+        response = self.client.get('/about/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_visitor_submission_keeps_cache(self):
+        self.client.get('/about/')
+        with self.captureOnCommitCallbacks(execute=True):
+            ContactInquiry.objects.create(
+                full_name='Test', email='test@example.com', service_interest='SEO', project_details='-',
+            )
+        self.assertEqual(self.client.get('/about/')['X-Page-Cache'], 'HIT')
+
+    def test_post_bypasses_cache(self):
+        self.client.get('/contact/')
+        self.assertNotIn('X-Page-Cache', self.client.post('/contact/', {}))
+
+
+class CodeVersionTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_template_change_raises_code_version(self):
+        templates = _temp_dir(self)
+        template = templates / 'page.html'
+        template.write_text('<p>page</p>')
+        future = time.time_ns() + 3600 * 10 ** 9
+        os.utime(template, ns=(future, future))
+        with override_settings(TEMPLATES=[{**settings.TEMPLATES[0], 'DIRS': [templates]}]):
+            self.assertEqual(page_cache.code_version(), future)
+
+    def test_newer_code_retires_cached_pages(self):
+        etag = self.client.get('/about/')['ETag']
+        # A worker started after a deploy that edited a template.
+        with mock.patch.object(page_cache, 'CODE_VERSION', time.time_ns()):
+            response = self.client.get('/about/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ContentBundleTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_bundle_is_cached(self):
+        content_bundles.get_page_bundle('about')
+        with self.assertNumQueries(0):
+            bundle = content_bundles.get_page_bundle('about')
+        self.assertEqual(bundle['advantages'], [])
+
+    def test_save_invalidates_only_pages_reading_the_model(self):
+        about = content_bundles.get_page_version('about')
+        services = content_bundles.get_page_version('services')
+        with self.captureOnCommitCallbacks(execute=True):
+            advantage = AboutPageAdvantage.objects.create(title='Support', description='-', icon='bolt')
+        self.assertNotEqual(content_bundles.get_page_version('about'), about)
+        self.assertEqual(content_bundles.get_page_version('services'), services)
+        self.assertEqual(content_bundles.get_page_bundle('about')['advantages'], [advantage])
+
+    def test_pages_for_model(self):
+        self.assertEqual(content_bundles.pages_for_model(AboutPageAdvantage), ['about'])
+        self.assertEqual(content_bundles.pages_for_model(ContactInquiry), [])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get('/about/')['ETag']
+        response = self.client.get('/about/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unchanged_since_gets_304(self):
+        last_modified = self.client.get('/about/')['Last-Modified']
+        response = self.client.get('/about/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_content_change_changes_etag(self):
+        etag = self.client.get('/about/')['ETag']
+        content_bundles.invalidate_pages(['about'])
+        response = self.client.get('/about/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(SECURE_SSL_REDIRECT=True, SECURE_PROXY_SSL_HEADER=('HTTP_X_FORWARDED_PROTO', 'https'))
+class PublishTests(TestCase):
+    """Publish renders behind the production HTTPS redirect."""
+
+    def setUp(self):
+        self.root = _isolate_caches(self) / 'published'
+        _override(self, DEBUG=False, PUBLISH_HOST='testserver', PUBLISH_ROOT=str(self.root))
+
+    def test_secure_request_is_not_redirected(self):
+        response = internal_requests.get('testserver', '/about/', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_publish_writes_pages(self):
+        results = dict(publishing.publish_pages(names={'about'}))
+        self.assertTrue(results['/about/'])
+        self.assertIn('</html>', (self.root / 'about' / 'index.html').read_text())
+        self.assertTrue((self.root / 'about' / 'index.html.gz').exists())
+
+    @override_settings(PAGE_STREAMING_ENABLED=True)
+    def test_publish_renders_streamed_pages(self):
+        self.assertIn('</html>', publishing.render_path('/'))
+
+    def test_content_save_removes_files_before_republishing(self):
+        publishing.publish_pages(names={'about'})
+        with mock.patch.object(publishing, 'publish_pages') as publish:
+            thread = publishing.republish_pages(['about'])
+            # Gone as soon as the save commits: nginx proxies /about/ to Django meanwhile.
+            self.assertFalse((self.root / 'about' / 'index.html').exists())
+            thread.join()
+        publish.assert_called_once_with(names={'about'})
+
+
+class PrecompressedPageTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_hit_serves_stored_gzip(self):
+        plain = self.client.get('/about/').content
+        response = self.client.get('/about/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain)
+
+    def test_identity_when_not_accepted(self):
+        self.client.get('/about/')
+        response = self.client.get('/about/', HTTP_ACCEPT_ENCODING='identity')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_negotiation(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.5, br;q=0')
+        self.assertEqual(accepted_encodings(request), {'deflate', 'gzip'})
+        self.assertEqual(negotiate_encoding(request), 'gzip')
+        self.assertEqual(negotiate_encoding(request, variants=('identity',)), 'identity')
+
+
+@override_settings(SECURE_SSL_REDIRECT=True, SECURE_PROXY_SSL_HEADER=('HTTP_X_FORWARDED_PROTO', 'https'))
+class StaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        _override(self, PAGE_CACHE_STALE_TIMEOUT=300)
+
+    def test_invalidated_page_is_served_stale_while_refreshing(self):
+        etag = self.client.get('/about/', secure=True)['ETag']
+        content_bundles.invalidate_pages(['about'])
+        with mock.patch.object(page_cache, '_schedule_refresh') as schedule:
+            response = self.client.get('/about/', secure=True)
+        self.assertEqual(response['X-Page-Cache'], 'STALE')
+        self.assertEqual(response['ETag'], etag)
+        schedule.assert_called_once()
+
+    def test_refresh_stores_the_page(self):
+        etag = self.client.get('/about/', secure=True)['ETag']
+        content_bundles.invalidate_pages(['about'])
+        key = page_cache.page_cache_key(RequestFactory().get('/about/', secure=True))
+        lock = page_cache._fill_lock(key)
+        self.assertTrue(lock.acquire())
+        page_cache._refresh_page(lock, 'testserver', True, '/about/')
+        self.assertFalse(lock.locked())
+        response = self.client.get('/about/', secure=True)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(PAGE_CACHE_STALE_TIMEOUT=0)
+    def test_without_stale_window_invalidated_page_is_rendered(self):
+        self.client.get('/about/', secure=True)
+        content_bundles.invalidate_pages(['about'])
+        self.assertEqual(self.client.get('/about/', secure=True)['X-Page-Cache'], 'MISS')
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        self.key = page_cache.page_cache_key(RequestFactory().get('/about/'))
+
+    def test_waiter_serves_the_holders_page(self):
+        self.client.get('/about/')
+        entry = cache.get(self.key)
+        cache.delete(self.key)
+        lock = page_cache._fill_lock(self.key)
+        self.assertTrue(lock.acquire())
+        self.addCleanup(lock.release)
+        # Another worker finishes rendering while this request waits.
+        filler = threading.Timer(0.2, cache.set, args=(self.key, entry, None))
+        filler.start()
+        self.addCleanup(filler.join)
+        with self.assertNumQueries(0):
+            response = self.client.get('/about/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    @override_settings(PAGE_CACHE_FILL_WAIT=0.2)
+    def test_waiter_renders_when_the_holder_gives_up(self):
+        lock = page_cache._fill_lock(self.key)
+        self.assertTrue(lock.acquire())
+        self.addCleanup(lock.release)
+        self.assertEqual(self.client.get('/about/')['X-Page-Cache'], 'MISS')
+
+
+class _StubServer(http.server.ThreadingHTTPServer):
+    """Local HTTP server that records each GET as (Host, path, Accept-Encoding) and answers 200."""
+
+    def __init__(self):
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.headers['Host'], self.path, self.headers['Accept-Encoding']))
+                self.send_response(200)
+                self.send_header('X-Page-Cache', 'MISS')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+
+def _start_stub_server(test):
+    server = _StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+class NginxCacheTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        # Stands in for nginx's loopback refresh server.
+        self.server = _start_stub_server(self)
+        _override(self, NGINX_CACHE_TIMEOUT=60, NGINX_CACHE_PURGE_URL=self.server.url)
+
+    def test_page_is_marked_for_nginx(self):
+        response = self.client.get('/about/')
+        self.assertEqual(response['X-Accel-Expires'], '60')
+        self.assertIn('page:about', response['Surrogate-Key'].split())
+        self.assertIn('model:aboutpageadvantage', response['Surrogate-Key'].split())
+
+    def test_query_string_responses_are_not_stored(self):
+        self.assertEqual(self.client.get('/about/?utm_source=ad')['X-Accel-Expires'], '0')
+        self.assertIsNone(cache.get(nginx_cache._index_key('about')))
+
+    def test_content_save_refreshes_cached_urls_inline(self):
+        self.client.get('/about/')
+        self.client.get('/services/')
+        with self.captureOnCommitCallbacks(execute=True):
+            AboutPageAdvantage.objects.create(title='Support', description='-', icon='bolt')
+        # Not a gunicorn worker: done before the save returns (a management command may exit next).
+        self.assertEqual(
+            sorted(self.server.requests),
+            sorted(('testserver', '/about/', encoding) for encoding in nginx_cache.CACHED_ENCODINGS),
+        )
+
+    def test_server_workers_refresh_in_the_background(self):
+        self.client.get('/about/')
+        with mock.patch.object(nginx_cache, '_background', True):
+            thread = nginx_cache.purge_pages(['about'])
+        thread.join()
+        self.assertEqual(len(self.server.requests), len(nginx_cache.CACHED_ENCODINGS))
+
+
+class WarmUpTests(TestCase):
+    def test_compile_templates(self):
+        self.assertGreater(compile_templates(), 0)
+
+    def test_fetch_paths_in_order(self):
+        server = _start_stub_server(self)
+        results = fetch_paths(['/about/', '/'], server.url, 'example.com', concurrency=2)
+        self.assertEqual([(path, status, note) for path, status, _, note in results], [
+            ('/about/', 200, 'MISS'),
+            ('/', 200, 'MISS'),
+        ])
+        self.assertIn(('example.com', '/about/', 'br, gzip'), server.requests)
+
+    def test_connection_errors_are_reported(self):
+        server = _StubServer()
+        url = server.url
+        server.server_close()  # nothing listens there any more
+        [(path, status, _, note)] = fetch_paths(['/about/'], url, 'example.com', timeout=2)
+        self.assertIsNone(status)
+        self.assertTrue(note)
+
+    def test_warm_cache_command(self):
+        server = _start_stub_server(self)
+        output = io.StringIO()
+        call_command('warm_cache', '--base-url', server.url, '--host', 'example.com', stdout=output)
+        self.assertIn('Warmed', output.getvalue())
+        self.assertIn(('example.com', '/about/', 'br, gzip'), server.requests)
+
+
+class CachePathTests(SimpleTestCase):
+    def test_tracking_parameters_are_dropped(self):
+        request = RequestFactory().get('/about/?utm_source=ad&b=2&gclid=x&a=1')
+        self.assertEqual(page_cache.cache_path(request), '/about/?b=2&a=1')
+
+    def test_path_without_query(self):
+        request = RequestFactory().get('/about/?utm_medium=email')
+        self.assertEqual(page_cache.cache_path(request), '/about/')
+
+    def test_tracking_only_urls_share_a_key(self):
+        factory = RequestFactory()
+        self.assertEqual(
+            page_cache.page_cache_key(factory.get('/about/?utm_campaign=spring')),
+            page_cache.page_cache_key(factory.get('/about/')),
+        )
+
+
+class TrackedLandingTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_tagged_link_hits_the_plain_page(self):
+        self.client.get('/about/')
+        response = self.client.get('/about/?utm_source=newsletter&fbclid=abc')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    def test_other_parameters_get_their_own_copy(self):
+        self.client.get('/about/')
+        self.assertEqual(self.client.get('/about/?page=2')['X-Page-Cache'], 'MISS')
+
+
+class FormPageTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_cached_page_has_empty_csrf_inputs(self):
+        self.client.get('/contact/')
+        response = self.client.get('/contact/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value=""')
+
+    def test_flash_messages_are_filled_into_the_cached_page(self):
+        self.client.get('/contact/')
+        self.client.post('/contact/', {'full_name': ''})  # redirects with an error message
+        response = self.client.get('/contact/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'Please fill in all required fields.')
+        self.assertIn('private', response['Cache-Control'])
+        # Shown once: the stored copy itself has no messages.
+        self.assertNotContains(self.client.get('/contact/'), 'Please fill in all required fields.')
+
+    def test_csrf_endpoint(self):
+        self.assertTrue(self.client.get('/api/csrf/').json()['csrfToken'])
+
+
+def _open_cache(path):
+    return MmapCache(path, {'OPTIONS': {'SIZE': 64 * 1024, 'SLOTS': 64}})
+
+
+def _increment(path, times):
+    counter = _open_cache(path)
+    for _ in range(times):
+        counter.incr('counter')
+
+
+def _store(path, key, value):
+    _open_cache(path).set(key, value, None)
+
+
+class MmapCacheTests(SimpleTestCase):
+    def make_cache(self):
+        self.path = str(_temp_dir(self) / 'cache.mmap')
+        return _open_cache(self.path)
+
+    def test_add_only_sets_missing_keys(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add('key', 1))
+        self.assertFalse(cache.add('key', 2))
+        self.assertEqual(cache.get('key'), 1)
+
+    def test_entries_outlive_the_process_that_stored_them(self):
+        cache = self.make_cache()
+        context = multiprocessing.get_context('fork')
+        worker = context.Process(target=_store, args=(self.path, 'key', 'value'))
+        worker.start()
+        worker.join()
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_incr_is_atomic_across_processes(self):
+        cache = self.make_cache()
+        cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_increment, args=(self.path, 200)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(cache.get('counter'), 800)
+
+    def test_incr_of_missing_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.make_cache().incr('missing')
+
+    def test_expired_entries_are_misses(self):
+        cache = self.make_cache()
+        cache.set('key', 'value', 60)
+        self.assertEqual(cache.get('key'), 'value')
+        with mock.patch('website.cache_backends.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('key'))
+            self.assertTrue(cache.add('key', 'new', 60))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache()
+        cache.set('kept', 'x' * 1000, None)
+        for number in range(100):
+            cache.set(f'filler-{number}', 'x' * 1000, None)
+            cache.get('kept')
+        self.assertIsNotNone(cache.get('kept'))
+        self.assertIsNone(cache.get('filler-0'))
+        self.assertIsNotNone(cache.get('filler-99'))
+
+    def test_interrupted_compaction_starts_empty(self):
+        cache = self.make_cache()
+        cache.set('key', 'value', None)
+        store = cache._store
+        header = list(_HEADER.unpack_from(store.map, 0))
+        header[0] = _DIRTY_MAGIC
+        _HEADER.pack_into(store.map, 0, *header)
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 'again', None)
+        self.assertEqual(cache.get('key'), 'again')
+
+    def test_unreadable_entry_is_a_miss(self):
+        cache = self.make_cache()
+        cache.set('key', 'value', None)
+        store = cache._store
+        _, offset, length, _, _ = store._read_slot(store._find(cache._digest('key', None)))
+        start = store.data_start + offset
+        store.map[start:start + length] = bytes(length)
+        self.assertEqual(cache.get('key', 'default'), 'default')
+        self.assertFalse(cache.has_key('key'))
+
+
+class SingletonTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        patcher = mock.patch.dict(singletons._instances, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_row_is_kept_in_process_memory(self):
+        first = singletons.get_singleton(AboutPageCTA, is_active=True)
+        with self.assertNumQueries(0):
+            self.assertIs(singletons.get_singleton(AboutPageCTA, is_active=True), first)
+
+    def test_save_makes_workers_refetch(self):
+        AboutPageCTA.objects.all().delete()
+        singletons.get_singleton(AboutPageCTA, is_active=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            cta = AboutPageCTA.objects.create(headline='Talk to us')
+        with self.assertNumQueries(1):
+            self.assertEqual(singletons.get_singleton(AboutPageCTA, is_active=True), cta)
+
+    def test_filters_are_cached_separately(self):
+        AboutPageCTA.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            AboutPageCTA.objects.create(headline='Hidden', is_active=False)
+        self.assertIsNone(singletons.get_singleton(AboutPageCTA, is_active=True))
+        self.assertEqual(singletons.get_singleton(AboutPageCTA, is_active=False).headline, 'Hidden')
+
+
+class QueryCacheTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        Partner.objects.all().delete()
+        AboutPageAdvantage.objects.all().delete()
+        Partner.objects.create(name='Acme', logo='partners/acme.svg', order=1)
+
+    def test_rows_are_cached(self):
+        def run():
+            rows = [partner.name for partner in Partner.objects.order_by('order').cached()]
+            return rows, Partner.objects.cached().count(), Partner.objects.cached().exists()
+
+        self.assertEqual(run(), (['Acme'], 1, True))
+        with self.assertNumQueries(0):
+            self.assertEqual(run(), (['Acme'], 1, True))
+
+    def test_save_retires_results(self):
+        self.assertEqual(Partner.objects.cached().count(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Partner.objects.create(name='Globex', logo='partners/globex.svg', order=2)
+        with self.assertNumQueries(1):
+            self.assertEqual(Partner.objects.cached().count(), 2)
+
+    def test_subquery_tables_are_part_of_the_key(self):
+        titled = Partner.objects.filter(name__in=AboutPageAdvantage.objects.values('title'))
+        exists = Partner.objects.filter(Exists(AboutPageAdvantage.objects.filter(title=OuterRef('name'))))
+        for queryset in (titled, exists):
+            _, _, tables = compile_queryset(queryset)
+            self.assertIn(AboutPageAdvantage._meta.db_table, tables)
+        self.assertEqual(titled.cached().count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            AboutPageAdvantage.objects.create(title='Acme', description='-', icon='bolt')
+        self.assertEqual(titled.cached().count(), 1)
+
+    def test_union_tables_are_part_of_the_key(self):
+        union = Partner.objects.order_by().values('name').union(AboutPageAdvantage.objects.order_by().values('title'))
+        self.assertIn(AboutPageAdvantage._meta.db_table, compile_queryset(union)[2])
+
+    def test_always_empty_query_is_not_cached(self):
+        self.assertIsNone(compile_queryset(Partner.objects.filter(pk__in=[])))
+        self.assertEqual(list(Partner.objects.filter(pk__in=[]).cached()), [])
+
+
+class CompactTests(TestCase):
+    def setUp(self):
+        service = ServiceDetail.objects.create(title='SEO', description='-', detail_page_url='/seo/')
+        ServiceFeature.objects.create(service=service, feature_text='Audits', order=1)
+        ServiceFeature.objects.create(service=service, feature_text='Links', order=2)
+
+    def round_trip(self, value):
+        return unpack(pickle.loads(pickle.dumps(pack(value))))
+
+    def test_instances_round_trip(self):
+        service = ServiceDetail.objects.get(title='SEO')
+        [restored] = self.round_trip([service])
+        self.assertEqual(restored, service)
+        self.assertFalse(restored._state.adding)
+        self.assertEqual(
+            {field.attname: getattr(restored, field.attname) for field in ServiceDetail._meta.concrete_fields},
+            {field.attname: getattr(service, field.attname) for field in ServiceDetail._meta.concrete_fields},
+        )
+
+    def test_related_objects_come_back_without_queries(self):
+        services = list(ServiceDetail.objects.filter(title='SEO').prefetch_related('features'))
+        features = list(ServiceFeature.objects.select_related('service').filter(service__title='SEO'))
+        restored_services, restored_features = self.round_trip((services, features))
+        with self.assertNumQueries(0):
+            self.assertEqual([f.feature_text for f in restored_services[0].features.all()], ['Audits', 'Links'])
+            self.assertIs(restored_services[0].features.all()[0].service, restored_services[0])
+            self.assertEqual(restored_features[0].service.title, 'SEO')
+
+    def test_deferred_fields_stay_deferred(self):
+        [restored] = self.round_trip(list(ServiceDetail.objects.filter(title='SEO').only('title')))
+        self.assertEqual(restored.get_deferred_fields(), {
+            field.attname for field in ServiceDetail._meta.concrete_fields if field.name not in ('id', 'title')
+        })
+        self.assertEqual(restored.description, '-')  # loaded on access, like any deferred field
+
+    def test_records_are_smaller_than_pickled_instances(self):
+        ServiceDetail.objects.bulk_create(
+            ServiceDetail(title=f'Service {number}', description='-', detail_page_url='/') for number in range(20)
+        )
+        services = list(ServiceDetail.objects.all())
+        self.assertLess(len(pickle.dumps(pack(services))), len(pickle.dumps(services)))
+
+
+@override_settings(NODE_NAME='web-1', INVALIDATION_BUS_URL='', INVALIDATION_BUS_POLL_INTERVAL=1.0)
+class InvalidationBusTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        self.node_calls, self.process_calls = [], []
+        patcher = mock.patch.dict(invalidation_bus._handlers, {'test': [
+            (self.node_calls.append, invalidation_bus.NODE),
+            (self.process_calls.append, invalidation_bus.PROCESS),
+        ]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bus = invalidation_bus.DatabaseBus()
+        patcher = mock.patch.object(invalidation_bus, '_bus', self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_event_from_another_node_runs_once_per_node(self):
+        self.bus.publish('test', 'a', 'web-2:100')
+        cursor = invalidation_bus.poll(0)
+        self.assertEqual(cursor, CacheInvalidation.objects.get().pk)
+        # A second worker of this node: the node handler was claimed by the first.
+        invalidation_bus.poll(0)
+        self.assertEqual(self.node_calls, ['a'])
+        self.assertEqual(self.process_calls, ['a', 'a'])
+        self.assertEqual(invalidation_bus.poll(cursor), cursor)
+
+    def test_event_from_this_node_runs_in_the_other_workers_only(self):
+        self.bus.publish('test', 'a', 'web-1:100')
+        self.bus.publish('test', 'b', invalidation_bus.process_origin())
+        invalidation_bus.poll(0)
+        self.assertEqual(self.node_calls, [])
+        self.assertEqual(self.process_calls, ['a'])
+
+    def test_remote_content_change_invalidates_its_pages(self):
+        version = content_bundles.get_page_version('about')
+        self.bus.publish('model', 'website.AboutPageAdvantage', 'web-2:100')
+        invalidation_bus.poll(0)
+        self.assertNotEqual(content_bundles.get_page_version('about'), version)
+
+    def test_content_saves_are_published(self):
+        AboutPageAdvantage.objects.create(title='Support', description='-', icon='bolt')
+        ContactInquiry.objects.create(full_name='Test', email='test@example.com', service_interest='SEO')
+        self.assertEqual(
+            list(CacheInvalidation.objects.values_list('kind', 'name')),
+            [('model', 'website.AboutPageAdvantage')],
+        )
+
+    def test_old_events_are_deleted(self):
+        old = CacheInvalidation.objects.create(id=199, kind='test', name='old', origin='web-2:100')
+        CacheInvalidation.objects.filter(pk=old.pk).update(
+            created_at=old.created_at - timedelta(seconds=invalidation_bus.RETENTION + 1),
+        )
+        self.bus.publish('test', 'new', 'web-2:100')  # id 200: every 100th event cleans up
+        self.assertEqual(list(CacheInvalidation.objects.values_list('name', flat=True)), ['new'])
+
+    @override_settings(INVALIDATION_BUS_POLL_INTERVAL=0)
+    def test_disabled_bus_neither_publishes_nor_listens(self):
+        invalidation_bus.publish('test', 'a')
+        self.assertFalse(CacheInvalidation.objects.exists())
+        self.assertIsNone(invalidation_bus.start_listener())
+
+
+class DatabaseUnavailableTests(TestCase):
+    def setUp(self):
+        self.directory = _isolate_caches(self)
+
+    def database_down(self):
+        return mock.patch.object(content_bundles, 'load_page_bundle', side_effect=DatabaseError('database is locked'))
+
+    def expect_503_logs(self):
+        return self.assertLogs('django.request', 'ERROR')
+
+    def test_last_good_copy_is_served(self):
+        etag = self.client.get('/about/')['ETag']
+        content_bundles.invalidate_pages(['about'])
+        with self.database_down(), self.assertLogs('website.middleware', 'ERROR'):
+            response = self.client.get('/about/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'FALLBACK')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Retry-After'], str(settings.DB_UNAVAILABLE_RETRY_AFTER))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_page_without_copy_is_a_503(self):
+        with self.database_down(), self.assertLogs('website.middleware', 'ERROR'), self.expect_503_logs():
+            response = self.client.get('/about/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    def test_query_string_pages_get_no_copy(self):
+        self.client.get('/about/?page=2')
+        self.assertIsNone(load_page(page_cache.page_cache_key(RequestFactory().get('/about/?page=2'))))
+
+    def test_form_post_redirects_with_a_message(self):
+        data = {
+            'full_name': 'Test', 'email': 'test@example.com', 'service_interest': 'SEO',
+            'project_details': 'Details',
+        }
+        with mock.patch.object(ContactInquiry, 'save', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('website.middleware', 'ERROR'):
+            response = self.client.post('/contact/', data)
+            with self.expect_503_logs():
+                ajax = self.client.post('/contact/', data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertRedirects(response, '/contact/', fetch_redirect_response=False)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(ajax.status_code, 503)
+        self.assertFalse(ajax.json()['success'])
+
+    @override_settings(LAST_GOOD_MAX_FILES=2)
+    def test_oldest_copies_are_removed_beyond_the_cap(self):
+        entry = {'variants': {}}
+        now = time.time()
+        for age, key in ((2, 'page:a'), (1, 'page:b'), (0, 'page:c')):
+            save_page(key, entry)
+            os.utime(self.directory / 'last_good' / f'{key[5:]}.page', (now - age, now - age))
+        self.assertIsNone(load_page('page:a'))
+        self.assertEqual(load_page('page:c'), entry)
+
+
+class CachePolicyTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def cache_control(self, response):
+        return {directive.strip() for directive in response['Cache-Control'].split(',')}
+
+    def cached_get(self, path):
+        # The render that fills the cache sets the CSRF cookie: no shared policy on that response.
+        self.client.get(path)
+        self.client.cookies.clear()
+        return self.client.get(path)
+
+    def test_content_page(self):
+        self.assertEqual(
+            self.cache_control(self.cached_get('/about/')),
+            {'public', 'max-age=300', 's-maxage=600', 'stale-while-revalidate=86400'},
+        )
+
+    def test_response_setting_a_cookie_gets_no_policy(self):
+        response = self.client.get('/about/')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertNotIn('Cache-Control', response)
+
+    def test_revalidated_page_repeats_the_policy(self):
+        etag = self.client.get('/about/')['ETag']
+        response = self.client.get('/about/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('max-age=300', self.cache_control(response))
+
+    def test_form_page_is_always_revalidated(self):
+        self.assertEqual(self.cache_control(self.cached_get('/contact/')), {'public', 'no-cache'})
+
+    def test_legal_page(self):
+        self.assertIn('max-age=3600', self.cache_control(self.cached_get('/privacy-policy/')))
+
+    def test_post_is_never_stored(self):
+        self.assertEqual(self.cache_control(self.client.post('/contact/', {})), {'no-store'})
+
+    def test_page_with_flash_messages_is_private(self):
+        self.client.post('/contact/', {})
+        self.assertIn('private', self.cache_control(self.client.get('/contact/')))
+
+
+@override_settings(FRAGMENT_CACHE_ENABLED=True)
+class FragmentCacheTests(TestCase):
+    template = Template(
+        '{% load fragment_cache %}{% fragment "advantages" advantages %}'
+        '{% for advantage in advantages %}{{ advantage.title }};{% endfor %}{% endfragment %}'
+    )
+
+    def setUp(self):
+        _isolate_caches(self)
+        AboutPageAdvantage.objects.all().delete()
+        self.advantage = AboutPageAdvantage.objects.create(title='Support', description='-', icon='bolt')
+
+    def render(self, advantages=None):
+        if advantages is None:
+            advantages = AboutPageAdvantage.objects.order_by('pk')
+        return self.template.render(Context({'advantages': advantages}))
+
+    def test_fragment_is_rendered_once_per_content_change(self):
+        self.assertEqual(self.render(), 'Support;')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(), 'Support;')  # the queryset isn't run on a hit
+        self.advantage.title = 'Round-the-clock support'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.advantage.save()
+        self.assertEqual(self.render(), 'Round-the-clock support;')
+
+    def test_objects_are_part_of_the_key(self):
+        other = AboutPageAdvantage.objects.create(title='Speed', description='-', icon='bolt')
+        self.assertEqual(self.render([self.advantage]), 'Support;')
+        self.assertEqual(self.render([other]), 'Speed;')
+
+    def test_csrf_inputs_are_stored_empty(self):
+        template = Template('{% load fragment_cache %}{% fragment "form" %}{% csrf_token %}{% endfragment %}')
+        html = template.render(Context({'csrf_token': 'secret'}))
+        self.assertIn('value=""', html)
+        self.assertNotIn('secret', html)
+
+
+@override_settings(PAGE_STREAMING_ENABLED=True)
+class StreamingTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+
+    def test_home_streams_without_queries_after_the_response(self):
+        response = self.client.get('/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        with self.assertNumQueries(0):
+            html = b''.join(response.streaming_content).decode()
+        self.assertIn('</html>', html)
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'HIT')
+
+    def test_query_errors_are_raised_before_the_response(self):
+        broken = AboutPageAdvantage.objects.extra(where=['no_such_column = 1'])
+        with self.assertRaises(DatabaseError):
+            stream_page(RequestFactory().get('/'), 'website/index.html', {'advantages': broken})
+
+    def test_database_error_on_home_serves_the_last_good_copy(self):
+        b''.join(self.client.get('/').streaming_content)
+        cache.delete(page_cache.page_cache_key(RequestFactory().get('/')))  # evicted; a new render is due
+        with mock.patch.object(views, '_home_context', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('website.middleware', 'ERROR'):
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'FALLBACK')
+
+    def test_service_pages_render_in_one_piece(self):
+        response = self.client.get('/services/web-development/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+
+
+class CountryLookupTests(TestCase):
+    def setUp(self):
+        directory = _isolate_caches(self)
+        _override(self, GEOIP_DB_PATH=str(directory / 'missing.bin'))
+
+    def create_inquiry(self, ip_address='8.8.8.8'):
+        return ContactInquiry.objects.create(
+            full_name='Test', email='test@example.com', service_interest='SEO',
+            project_details='Details', country=geolocation.COUNTRY_PENDING, ip_address=ip_address,
+        )
+
+    def test_form_post_queues_the_lookup(self):
+        data = {
+            'full_name': 'Test', 'email': 'test@example.com', 'service_interest': 'SEO',
+            'project_details': 'Details',
+        }
+        with mock.patch.object(geolocation, '_enqueue') as enqueue, \
+                mock.patch.object(geolocation, 'query_providers') as query_providers, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/contact/', data, REMOTE_ADDR='8.8.8.8')
+        inquiry = ContactInquiry.objects.get()
+        self.assertEqual(inquiry.country, geolocation.COUNTRY_PENDING)
+        enqueue.assert_called_once_with(inquiry.pk)
+        query_providers.assert_not_called()
+
+    def test_lookup_stores_the_country(self):
+        inquiry = self.create_inquiry()
+        with mock.patch.object(geolocation, 'query_providers', return_value='United States'):
+            self.assertEqual(geolocation.resolve_inquiry_country(inquiry.pk), 'United States')
+        inquiry.refresh_from_db()
+        self.assertEqual(inquiry.country, 'United States')
+
+    def test_private_addresses_are_not_looked_up(self):
+        with mock.patch.object(geolocation, 'query_providers') as query_providers:
+            self.assertEqual(geolocation.get_country_from_ip('192.168.1.5'), geolocation.LOCAL_COUNTRY)
+            self.assertEqual(geolocation.get_country_from_ip('not an ip'), geolocation.UNKNOWN_COUNTRY)
+        query_providers.assert_not_called()
+
+    def test_sweep_resolves_rows_left_pending(self):
+        old = self.create_inquiry()
+        ContactInquiry.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(hours=1))
+        recent = self.create_inquiry()
+        with mock.patch.object(geolocation, 'query_providers', return_value='United States'):
+            self.assertEqual(geolocation.resolve_pending(older_than=geolocation.PENDING_SWEEP_AFTER), 1)
+        self.assertEqual(ContactInquiry.objects.get(pk=recent.pk).country, geolocation.COUNTRY_PENDING)
+
+
+class GeoipTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = _temp_dir(self)
+
+    def lookup(self, path, address):
+        return RangeDatabase(path).lookup(ipaddress.ip_address(address))
+
+    def test_lookup(self):
+        path = self.directory / 'ip.bin'
+        address = ipaddress.ip_address
+        write_database([
+            (address('1.0.0.0'), address('1.0.0.255'), 'Australia'),
+            (address('1.0.1.0'), address('1.0.3.255'), 'China'),
+            (address('2001:200::'), address('2001:200:ffff:ffff:ffff:ffff:ffff:ffff'), 'Japan'),
+        ], path)
+        self.assertEqual(self.lookup(path, '1.0.0.7'), 'Australia')
+        self.assertEqual(self.lookup(path, '1.0.2.1'), 'China')
+        self.assertEqual(self.lookup(path, '::ffff:1.0.2.1'), 'China')
+        self.assertEqual(self.lookup(path, '2001:200::1'), 'Japan')
+        self.assertIsNone(self.lookup(path, '1.0.4.0'))
+        self.assertIsNone(self.lookup(path, '2001:201::1'))
+
+    def test_lookups_use_the_database_before_the_providers(self):
+        path = self.directory / 'ip.bin'
+        address = ipaddress.ip_address
+        write_database([(address('8.8.8.0'), address('8.8.8.255'), 'United States')], path)
+        with override_settings(GEOIP_DB_PATH=str(path)), \
+                mock.patch.object(geolocation, 'query_providers') as query_providers:
+            self.assertEqual(geolocation.lookup_ip_country('8.8.8.8'), 'United States')
+        query_providers.assert_not_called()
+
+    def test_overlapping_ranges_are_rejected(self):
+        address = ipaddress.ip_address
+        with self.assertRaisesMessage(ValueError, 'overlapping ranges at 1.0.0.128'):
+            write_database([
+                (address('1.0.0.0'), address('1.0.0.255'), 'Australia'),
+                (address('1.0.0.128'), address('1.0.1.255'), 'China'),
+            ], self.directory / 'ip.bin')
+
+    def test_import_ipv4_and_ipv6_files(self):
+        # IP2Location layout: decimal ranges; the IPv6 file repeats the IPv4 table as ::ffff: rows.
+        ipv4 = self.directory / 'ipv4.csv'
+        ipv4.write_text('"16777216","16777471","AU","Australia"\n"16777472","16778239","CN","China"\n')
+        ipv6 = self.directory / 'ipv6.csv'
+        mapped = int(ipaddress.ip_address('::ffff:1.0.0.0'))
+        japan = int(ipaddress.ip_address('2001:200::'))
+        ipv6.write_text(
+            f'"{mapped}","{mapped + 255}","AU","Australia"\n'
+            f'"{mapped + 256}","{mapped + 1023}","CN","China"\n'
+            f'"{japan}","{japan + 2 ** 96 - 1}","JP","Japan"\n'
+        )
+        output = self.directory / 'ip.bin'
+        call_command('import_geoip', str(ipv4), str(ipv6), '--output', str(output), stdout=io.StringIO())
+        self.assertEqual(self.lookup(output, '1.0.1.1'), 'China')
+        self.assertEqual(self.lookup(output, '2001:200::1'), 'Japan')
+
+    def test_import_reports_overlaps(self):
+        path = self.directory / 'ranges.csv'
+        path.write_text('1.0.0.0,1.0.0.255,AU\n1.0.0.10,1.0.0.20,CN\n')
+        with self.assertRaises(CommandError):
+            call_command('import_geoip', str(path), '--output', str(self.directory / 'ip.bin'))
+
+
+class GeolocationCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = _isolate_caches(self)
+        _override(self, GEOIP_DB_PATH=str(directory / 'missing.bin'))
+
+    def test_answers_are_shared(self):
+        with mock.patch.object(geolocation, 'query_providers', return_value='United States') as query_providers:
+            self.assertEqual(geolocation.lookup_ip_country('8.8.8.8'), 'United States')
+            self.assertEqual(geolocation.lookup_ip_country('::ffff:8.8.8.8'), 'United States')
+        query_providers.assert_called_once_with('8.8.8.8')
+
+    def test_failures_are_remembered_for_a_shorter_time(self):
+        with mock.patch.object(geolocation, 'query_providers', return_value=None) as query_providers:
+            self.assertEqual(geolocation.lookup_ip_country('8.8.8.8'), geolocation.UNKNOWN_COUNTRY)
+            self.assertEqual(geolocation.lookup_ip_country('8.8.8.8'), geolocation.UNKNOWN_COUNTRY)
+            self.assertEqual(query_providers.call_count, 1)
+            later = time.time() + settings.GEOIP_NEGATIVE_CACHE_TIMEOUT + 1
+            with mock.patch('website.cache_backends.time.time', return_value=later):
+                geolocation.lookup_ip_country('8.8.8.8')
+            self.assertEqual(query_providers.call_count, 2)
+
+    def test_no_provider_available_is_not_remembered(self):
+        with mock.patch.object(geolocation, 'query_providers', side_effect=geo_providers.NoProviderAvailable):
+            self.assertEqual(geolocation.get_country_from_ip('8.8.8.8'), geolocation.UNKNOWN_COUNTRY)
+        with mock.patch.object(geolocation, 'query_providers', return_value='United States'):
+            self.assertEqual(geolocation.get_country_from_ip('8.8.8.8'), 'United States')
+
+
+def _provider_response(provider, country, status=200, headers=None):
+    response = mock.Mock(status_code=status, headers=headers or {})
+    response.json.return_value = {'status': 'success', 'country': country, 'country_name': country}
+    response.text = country
+    return response
+
+
+@override_settings(GEOIP_HEDGE_DELAY=0.05, GEOIP_LOOKUP_DEADLINE=2)
+class GeoProviderTests(SimpleTestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        self.asked = []
+
+    def serve(self, answers):
+        """Answer each provider's request from answers[name]: (delay, status, country, headers)."""
+        def get(url, timeout):
+            provider = next(provider for provider in geo_providers.PROVIDERS if url.startswith(provider.url.split('{')[0]))
+            self.asked.append(provider.name)
+            delay, status, country, headers = answers[provider.name]
+            time.sleep(delay)
+            return _provider_response(provider, country, status, headers)
+        return mock.patch.object(geo_providers.requests, 'get', side_effect=get)
+
+    def test_first_provider_answers_alone(self):
+        with self.serve({'ip-api': (0, 200, 'Germany', None)}):
+            self.assertEqual(geo_providers.query_providers('8.8.8.8'), 'Germany')
+        self.assertEqual(self.asked, ['ip-api'])
+
+    def test_slow_provider_is_hedged(self):
+        with self.serve({'ip-api': (0.5, 200, 'Germany', None), 'ipapi.co': (0, 200, 'France', None)}):
+            self.assertEqual(geo_providers.query_providers('8.8.8.8'), 'France')
+        self.assertEqual(self.asked, ['ip-api', 'ipapi.co'])
+
+    def test_rate_limited_provider_is_skipped(self):
+        first = geo_providers.PROVIDERS[0]
+        with self.serve({'ip-api': (0, 429, '', {'Retry-After': '600'}), 'ipapi.co': (0, 200, 'France', None)}):
+            with self.assertLogs('website.geo_providers', 'WARNING'):
+                self.assertEqual(geo_providers.query_providers('8.8.8.8'), 'France')
+            self.assertTrue(geo_providers.is_open(first))
+            self.asked.clear()
+            geo_providers.query_providers('8.8.4.4')
+        self.assertEqual(self.asked, ['ipapi.co'])
+
+    def test_repeated_failures_open_the_breaker(self):
+        first = geo_providers.PROVIDERS[0]
+        with self.serve({'ip-api': (0, 503, '', None), 'ipapi.co': (0, 200, 'France', None)}):
+            for _ in range(geo_providers.FAILURE_THRESHOLD - 1):
+                self.assertEqual(geo_providers.query_providers('8.8.8.8'), 'France')
+            self.assertFalse(geo_providers.is_open(first))
+            with self.assertLogs('website.geo_providers', 'WARNING'):
+                self.assertEqual(geo_providers.query_providers('8.8.8.8'), 'France')
+        self.assertTrue(geo_providers.is_open(first))
+
+    def test_token_bucket_limits_requests(self):
+        provider = geo_providers.PROVIDERS[0]
+        for _ in range(provider.burst):
+            self.assertTrue(geo_providers.take_token(provider))
+        self.assertFalse(geo_providers.take_token(provider))
+
+    def test_no_provider_available(self):
+        with mock.patch.object(geo_providers, 'is_open', return_value=True):
+            with self.assertRaises(geo_providers.NoProviderAvailable):
+                geo_providers.query_providers('8.8.8.8')
+
+
+class PendingCountryTests(TestCase):
+    def setUp(self):
+        directory = _isolate_caches(self)
+        _override(self, GEOIP_DB_PATH=str(directory / 'missing.bin'))
+
+    def test_no_provider_available_leaves_inquiry_pending(self):
+        inquiry = ContactInquiry.objects.create(
+            full_name='Test', email='test@example.com', service_interest='SEO',
+            project_details='Details', country=geolocation.COUNTRY_PENDING, ip_address='8.8.8.8',
+        )
+        with mock.patch.object(geo_providers, 'is_open', return_value=True):
+            with self.assertRaises(geo_providers.NoProviderAvailable):
+                geolocation.resolve_inquiry_country(inquiry.pk)
+        inquiry.refresh_from_db()
+        self.assertEqual(inquiry.country, geolocation.COUNTRY_PENDING)
+
+
+class BackfillCountriesTests(TestCase):
+    def setUp(self):
+        _isolate_caches(self)
+        self.inquiries = [
+            ContactInquiry.objects.create(
+                full_name='Test', email='test@example.com', service_interest='SEO', project_details='Details',
+                country=geolocation.UNKNOWN_COUNTRY, ip_address=f'8.8.8.{number}',
+            )
+            for number in range(4)
+        ]
+
+    def backfill(self, lookup, *args):
+        with mock.patch.object(backfill_countries, 'lookup_ip_country', side_effect=lookup):
+            call_command('backfill_countries', '--chunk-size', '1', *args, stdout=io.StringIO())
+
+    def countries(self):
+        return [inquiry.country for inquiry in ContactInquiry.objects.filter(
+            pk__in=[inquiry.pk for inquiry in self.inquiries]).order_by('pk')]
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        def failing(ip_address):
+            if ip_address == '8.8.8.2':
+                raise RuntimeError('interrupted')
+            return 'Germany'
+
+        with self.assertRaises(RuntimeError):
+            self.backfill(failing)
+        self.assertEqual(cache.get(backfill_countries.CHECKPOINT_KEY), self.inquiries[1].pk)
+        unknown = geolocation.UNKNOWN_COUNTRY
+        self.assertEqual(self.countries(), ['Germany', 'Germany', unknown, unknown])
+
+        asked = []
+        self.backfill(lambda ip_address: asked.append(ip_address) or 'France')
+        self.assertEqual(asked, ['8.8.8.2', '8.8.8.3'])
+        self.assertEqual(self.countries(), ['Germany', 'Germany', 'France', 'France'])
+        self.assertIsNone(cache.get(backfill_countries.CHECKPOINT_KEY))
+
+    def test_restart_ignores_checkpoint(self):
+        cache.set(backfill_countries.CHECKPOINT_KEY, self.inquiries[-1].pk, None)
+        self.backfill(lambda ip_address: 'France', '--restart')
+        self.assertEqual(self.countries(), ['France'] * 4)
+
+    def test_dry_run_writes_nothing(self):
+        self.backfill(lambda ip_address: 'France', '--dry-run')
+        self.assertEqual(self.countries(), [geolocation.UNKNOWN_COUNTRY] * 4)
+        self.assertIsNone(cache.get(backfill_countries.CHECKPOINT_KEY))
+
+    def test_waits_while_no_provider_is_available(self):
+        answers = iter([geo_providers.NoProviderAvailable('8.8.8.0')])
+
+        def lookup(ip_address):
+            for answer in answers:
+                raise answer
+            return 'France'
+
+        with mock.patch('time.sleep') as sleep:
+            self.backfill(lookup, '--wait', '5')
+        sleep.assert_called_once_with(5.0)
+        self.assertEqual(self.countries(), ['France'] * 4)
@@ -31,4 +31,5 @@ urlpatterns = [
     path('terms-of-service/', views.terms_of_service, name='terms_of_service'),
     path('newsletter/subscribe/', views.newsletter_subscribe, name='newsletter_subscribe'),
     path('api/chat/', views.chatbot_query, name='chatbot_query'),
+    path('api/csrf/', views.csrf_token, name='csrf_token'),
 ]
@@ -1,33 +1,30 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.views.decorators.cache import cache_control
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_GET, require_POST
 import logging
 from django.conf import settings
+from django.db import DatabaseError
 import google.generativeai as genai
 import json
 import time
-import requests
 from .models import (
     ContactInquiry, Newsletter, ContactPage, ContactPageFeature, ContactPageFAQ,
     HeroSection, HeroBenefit, CompanyStat,
     Service, Benefit, Guarantee, CaseStudy, Testimonial, Partner, CTASection,
-    ServicesPageHero, ServiceDetail, WhyChooseItem, WhyChooseSection, WhyChooseImage, ServicesPageCTA,
-    SEOAuditHero, SEOAuditService, SEOAuditTool, SEOAuditToolLogo,
-    SEOAuditProcess, SEOAuditResult, SEOAuditBenefit, SEOAuditHealthMetric,
-    SEOAuditTestimonial, SEOAuditCTA,
-    PMHero, PMService, PMTool, PMToolLogo, PMProcess, PMBenefit,
-    PMMetric, PMTestimonial, PMCTA,
-    FAHero, FAService, FATool, FAProcess, FABenefit, FATestimonial, FACTA,
-    SEOAuditHero, SEOAuditService, SEOAuditTool, SEOAuditToolLogo,
-    SEOAuditProcess, SEOAuditResult, SEOAuditBenefit, SEOAuditHealthMetric,
-    SEOAuditTestimonial, SEOAuditCTA,
-    AboutPageSEO, AboutPageHero, AboutPageMissionVision, AboutPageAdvantage,
-    AboutPageAdvantageSection, AboutPageTimeline, AboutPageTimelineSection,
-    AboutPageTeamMember, AboutPageTeamSection, AboutPageCTA
 )
 from .chatbot_context import get_chatbot_context
+from .content_bundles import get_page_bundle
+from .geolocation import COUNTRY_PENDING, UNKNOWN_COUNTRY, schedule_country_lookup
+from .page_cache import cache_public_page
+from .singletons import get_singleton
+from .streaming import stream_page
+
+# Home and service pages keep serving their previous copy for up to this many seconds after an
+# admin edit while a background re-render runs, so no visitor waits on the render.
+HIGH_TRAFFIC_STALE = 600
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +32,6 @@ logger = logging.getLogger(__name__)
 
 
 @require_GET
-@cache_control(max_age=86400, public=True)
 def robots_txt(request):
     """robots.txt: security-focused disallows + Sitemap URL for any host (staging/production)."""
     scheme = 'https' if not settings.DEBUG else request.scheme
@@ -49,8 +45,14 @@ def robots_txt(request):
         content_type='text/plain',
     )
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def home(request):
     """Homepage view with dynamic content"""
+    return stream_page(request, 'website/index.html', _home_context())
+
+
+def _home_context():
+    """Home page context; everything the template reads is loaded here (see stream_page)."""
     # All active home-page services (do not cap at 9 — adding BPO made 10+ cards and hid the last one).
     services_home = list(
         Service.objects.filter(is_active=True).order_by('order')
@@ -59,25 +61,25 @@ def home(request):
     # lg 3-col grid: last row has one card when n % 3 == 1 (1,4,7,10,…); template centers it with .home-services-grid-last-middle
     home_services_last_row_center = n > 0 and (n % 3 == 1)
     context = {
-        'hero_section': HeroSection.objects.first(),
+        'hero_section': get_singleton(HeroSection),
         'hero_benefits': HeroBenefit.objects.all().order_by('order'),
         'stats': CompanyStat.objects.all().order_by('order'),
         'services': services_home,
         'home_services_last_row_center': home_services_last_row_center,
         'benefits': Benefit.objects.all().order_by('order'),
         'guarantees': Guarantee.objects.all().order_by('order'),
-        'featured_case_study': CaseStudy.objects.filter(is_featured=True).first(),
+        'featured_case_study': CaseStudy.objects.filter(is_featured=True).prefetch_related('metrics').first(),
         'testimonials': Testimonial.objects.filter(is_active=True).order_by('order'),
-        'partners': Partner.objects.all().order_by('order'),
+        'partners': Partner.objects.order_by('order').cached(),
         'trusted_by_headline': _get_trusted_by_headline(),
-        'cta_section': CTASection.objects.first(),
+        'cta_section': get_singleton(CTASection),
     }
-    return render(request, 'website/index.html', context)
+    return context
 
 
 def _get_trusted_by_headline():
     """Resolve headline from first Partner's trusted_by_headline, replacing {count} with partner count."""
-    partners = Partner.objects.all().order_by('order')
+    partners = Partner.objects.order_by('order').cached()
     count = max(partners.count(), 5) if partners.exists() else 5
     first = partners.first()
     headline = (first.trusted_by_headline or "").strip() if first else ""
@@ -86,46 +88,18 @@ def _get_trusted_by_headline():
     return f"Trusted by {count}+ Global Enterprises"
 
 
+@cache_public_page
 def about(request):
     """About Us page view with dynamic content"""
-    from .models import (
-        AboutPageSEO, AboutPageHero, AboutPageMissionVision, AboutPageAdvantage,
-        AboutPageAdvantageSection, AboutPageTimeline, AboutPageTimelineSection,
-        AboutPageTeamMember, AboutPageTeamSection, AboutPageCTA
-    )
-    
-    seo = AboutPageSEO.objects.first()
-    hero = AboutPageHero.objects.filter(is_active=True).first()
-    mission_vision = AboutPageMissionVision.objects.filter(is_active=True).first()
-    advantage_section = AboutPageAdvantageSection.objects.filter(is_active=True).first()
-    advantages = AboutPageAdvantage.objects.filter(is_active=True).order_by('order')
-    timeline_section = AboutPageTimelineSection.objects.filter(is_active=True).first()
-    timeline_items = AboutPageTimeline.objects.filter(is_active=True).order_by('order')
-    team_section = AboutPageTeamSection.objects.filter(is_active=True).first()
-    team_members = AboutPageTeamMember.objects.filter(is_active=True).order_by('order')[:3]
-    cta = AboutPageCTA.objects.filter(is_active=True).first()
-    
-    context = {
-        'seo': seo,
-        'hero': hero,
-        'mission_vision': mission_vision,
-        'advantage_section': advantage_section,
-        'advantages': advantages,
-        'timeline_section': timeline_section,
-        'timeline_items': timeline_items,
-        'team_section': team_section,
-        'team_members': team_members,
-        'cta': cta,
-    }
-    
-    return render(request, 'website/about.html', context)
+    return render(request, 'website/about.html', get_page_bundle('about'))
 
 
+@cache_public_page
 def privacy_policy(request):
     """Privacy Policy page view with dynamic content"""
     from .models import PrivacyPolicy
     
-    policy = PrivacyPolicy.objects.filter(is_active=True).first()
+    policy = get_singleton(PrivacyPolicy, is_active=True)
     
     context = {
         'policy': policy,
@@ -134,11 +108,12 @@ def privacy_policy(request):
     return render(request, 'website/privacy-policy.html', context)
 
 
+@cache_public_page
 def terms_of_service(request):
     """Terms of Service page view with dynamic content"""
     from .models import TermsOfService
     
-    terms = TermsOfService.objects.filter(is_active=True).first()
+    terms = get_singleton(TermsOfService, is_active=True)
     
     context = {
         'terms': terms,
@@ -147,6 +122,7 @@ def terms_of_service(request):
     return render(request, 'website/terms-of-service.html', context)
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def services(request):
     """Services page view with dynamic content"""
     if request.method == 'POST':
@@ -169,13 +145,8 @@ def services(request):
         if not ip_address or ip_address == '':
             ip_address = request.META.get('REMOTE_ADDR', None)
         
-        # Get country from IP
-        country = ''
-        if ip_address:
-            try:
-                country = get_country_from_ip(ip_address)
-            except:
-                country = ''
+        # Country is looked up in the background once the inquiry is saved (website/geolocation.py)
+        country = COUNTRY_PENDING if ip_address else ''
         
         # Get UTM parameters if available
         utm_source = request.POST.get('utm_source', '')
@@ -184,7 +155,7 @@ def services(request):
         
         # Save inquiry to database
         if full_name and email and service_interest:
-            ContactInquiry.objects.create(
+            inquiry = ContactInquiry.objects.create(
                 full_name=full_name,
                 email=email,
                 phone=phone,
@@ -201,206 +172,85 @@ def services(request):
                 utm_medium=utm_medium,
                 utm_campaign=utm_campaign,
             )
+            if ip_address:
+                schedule_country_lookup(inquiry)
             messages.success(request, 'Thank you! Your inquiry has been submitted successfully. We will contact you soon.')
         else:
             messages.error(request, 'Please fill in all required fields.')
         
         return redirect('services')
     
-    context = {
-        'hero': ServicesPageHero.objects.first(),
-        'services': ServiceDetail.objects.filter(is_active=True).prefetch_related('features').order_by('order'),
-        'why_choose_section': WhyChooseSection.objects.first(),
-        'why_choose_items': WhyChooseItem.objects.filter(is_active=True).order_by('order'),
-        'why_choose_images': WhyChooseImage.objects.filter(is_active=True).order_by('order')[:4],  # Limit to 4 active images for 2x2 grid
-        'cta_section': ServicesPageCTA.objects.filter(is_active=True).prefetch_related('checklist_items').first(),
-    }
-    return render(request, 'website/services.html', context)
+    return render(request, 'website/services.html', get_page_bundle('services'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def web_development(request):
     """Web Development services page"""
-    from .models import (
-        WebDevHero, WebDevService, WebDevStackFeature, WebDevTechnology,
-        WebDevProcess, WebDevSEOBenefit, WebDevSEOMetric, WebDevCTA
-    )
-    
-    context = {
-        'hero': WebDevHero.objects.filter(is_active=True).first(),
-        'services': WebDevService.objects.filter(is_active=True),
-        'stack_features': WebDevStackFeature.objects.filter(is_active=True),
-        'technologies': WebDevTechnology.objects.filter(is_active=True),
-        'process_steps': WebDevProcess.objects.filter(is_active=True),
-        'seo_benefits': WebDevSEOBenefit.objects.filter(is_active=True),
-        'seo_metrics': WebDevSEOMetric.objects.filter(is_active=True),
-        'cta': WebDevCTA.objects.filter(is_active=True).first(),
-    }
-    
-    return render(request, 'website/web-development.html', context)
+    return render(request, 'website/web-development.html', get_page_bundle('web_development'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def digital_marketing(request):
     """Digital Marketing services page"""
-    from .models import (
-        DigitalMarketingHero, DigitalMarketingService, DigitalMarketingStrategy,
-        DigitalMarketingTestimonial, DigitalMarketingMetric, DigitalMarketingCTA
-    )
-    
-    context = {
-        'hero': DigitalMarketingHero.objects.filter(is_active=True).first(),
-        'services': DigitalMarketingService.objects.filter(is_active=True),
-        'strategy_steps': DigitalMarketingStrategy.objects.filter(is_active=True),
-        'testimonials': DigitalMarketingTestimonial.objects.filter(is_active=True),
-        'metrics': DigitalMarketingMetric.objects.filter(is_active=True),
-        'cta': DigitalMarketingCTA.objects.filter(is_active=True).first(),
-    }
-    
-    return render(request, 'website/digital-marketing.html', context)
+    return render(request, 'website/digital-marketing.html', get_page_bundle('digital_marketing'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def ai_solutions(request):
     """AI Solutions services page with dynamic content"""
-    from .models import (
-        AISolutionsHero, AIService, AITechnology, AITechnologyDetail,
-        AIImplementationStep, AIROIMetric, AIPerformanceMetric,
-        AITestimonial, AISolutionsCTA
-    )
-    
-    context = {
-        'hero': AISolutionsHero.objects.filter(is_active=True).first(),
-        'ai_services': AIService.objects.filter(is_active=True).order_by('order'),
-        'ai_technologies': AITechnology.objects.filter(is_active=True).order_by('order'),
-        'tech_details': AITechnologyDetail.objects.filter(is_active=True).order_by('order'),
-        'implementation_steps': AIImplementationStep.objects.filter(is_active=True).order_by('order'),
-        'roi_metrics': AIROIMetric.objects.filter(is_active=True).order_by('order'),
-        'performance_metrics': AIPerformanceMetric.objects.filter(is_active=True).order_by('order'),
-        'ai_testimonials': AITestimonial.objects.filter(is_active=True).order_by('order'),
-        'cta_section': AISolutionsCTA.objects.filter(is_active=True).first(),
-    }
-    return render(request, 'website/ai-solutions.html', context)
+    return render(request, 'website/ai-solutions.html', get_page_bundle('ai_solutions'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def app_development(request):
     """App Development services page"""
-    from .models import (
-        AppDevHero, AppDevService, AppDevStackFeature, AppDevTechnology,
-        AppDevProcess, AppDevFeature, AppDevPerformanceMetric,
-        AppDevTestimonial, AppDevCTA
-    )
-    
-    context = {
-        'hero': AppDevHero.objects.filter(is_active=True).first(),
-        'services': AppDevService.objects.filter(is_active=True),
-        'stack_features': AppDevStackFeature.objects.filter(is_active=True),
-        'technologies': AppDevTechnology.objects.filter(is_active=True),
-        'process_steps': AppDevProcess.objects.filter(is_active=True),
-        'features': AppDevFeature.objects.filter(is_active=True),
-        'performance_metrics': AppDevPerformanceMetric.objects.filter(is_active=True),
-        'testimonials': AppDevTestimonial.objects.filter(is_active=True),
-        'cta': AppDevCTA.objects.filter(is_active=True).first(),
-    }
-    
-    return render(request, 'website/app-development.html', context)
+    return render(request, 'website/app-development.html', get_page_bundle('app_development'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def seo_audit(request):
     """SEO Audit services page with dynamic content"""
-    context = {
-        'hero': SEOAuditHero.objects.filter(is_active=True).first(),
-        'seo_services': SEOAuditService.objects.filter(is_active=True).order_by('order'),
-        'seo_tools': SEOAuditTool.objects.filter(is_active=True).order_by('order'),
-        'tool_logos': SEOAuditToolLogo.objects.filter(is_active=True).order_by('order'),
-        'process_steps': SEOAuditProcess.objects.filter(is_active=True).order_by('step_number'),
-        'results': SEOAuditResult.objects.filter(is_active=True).first(),
-        'benefits': SEOAuditBenefit.objects.filter(is_active=True).order_by('order'),
-        'health_metrics': SEOAuditHealthMetric.objects.filter(is_active=True).order_by('order'),
-        'testimonials': SEOAuditTestimonial.objects.filter(is_active=True).order_by('order'),
-        'cta_section': SEOAuditCTA.objects.filter(is_active=True).first(),
-    }
-    return render(request, 'website/seo-audit.html', context)
+    return render(request, 'website/seo-audit.html', get_page_bundle('seo_audit'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def project_management(request):
     """Project Management services page"""
-    context = {
-        'hero': PMHero.objects.filter(is_active=True).first(),
-        'services': PMService.objects.filter(is_active=True).order_by('order'),
-        'tools': PMTool.objects.filter(is_active=True).order_by('order'),
-        'tool_logos': PMToolLogo.objects.filter(is_active=True).order_by('order'),
-        'process_steps': PMProcess.objects.filter(is_active=True).order_by('step_number'),
-        'benefits': PMBenefit.objects.filter(is_active=True).order_by('order'),
-        'metrics': PMMetric.objects.filter(is_active=True).order_by('order'),
-        'testimonials': PMTestimonial.objects.filter(is_active=True).order_by('order'),
-        'cta': PMCTA.objects.filter(is_active=True).first(),
-    }
-    return render(request, 'website/project-management.html', context)
+    return render(request, 'website/project-management.html', get_page_bundle('project_management'))
 
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def finance_accounting(request):
     """Finance & Accounting services page"""
-    context = {
-        'hero': FAHero.objects.filter(is_active=True).first(),
-        'services': FAService.objects.filter(is_active=True).order_by('order'),
-        'tools': FATool.objects.filter(is_active=True).order_by('order'),
-        'process_steps': FAProcess.objects.filter(is_active=True).order_by('order'),
-        'benefits': FABenefit.objects.filter(is_active=True).order_by('order'),
-        'testimonials': FATestimonial.objects.filter(is_active=True).order_by('order'),
-        'cta': FACTA.objects.filter(is_active=True).first(),
-    }
-    return render(request, 'website/finance-accounting.html', context)
+    return render(request, 'website/finance-accounting.html', get_page_bundle('finance_accounting'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def content_production(request):
     """Content Production & Creative services page"""
-    from .models import CPService, CPTool, CPBenefit, CPProcessStep, CPMetric, CPTestimonial, CPTechnology
-    
-    context = {
-        'services': CPService.objects.filter(is_active=True),
-        'tools': CPTool.objects.filter(is_active=True),
-        'technologies': CPTechnology.objects.filter(is_active=True),
-        'benefits': CPBenefit.objects.filter(is_active=True),
-        'process_steps': CPProcessStep.objects.filter(is_active=True),
-        'metrics': CPMetric.objects.filter(is_active=True),
-        'testimonials': CPTestimonial.objects.filter(is_active=True),
-    }
-    return render(request, 'website/content-production.html', context)
+    return render(request, 'website/content-production.html', get_page_bundle('content_production'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def virtual_assistance(request):
     """Virtual Assistance services page"""
-    from .models import VAHero, VAService, VABenefit, VACTA
-    
-    context = {
-        'hero': VAHero.objects.filter(is_active=True).first(),
-        'services': VAService.objects.filter(is_active=True).order_by('order'),
-        'benefits': VABenefit.objects.filter(is_active=True).order_by('order'),
-        'cta': VACTA.objects.filter(is_active=True).first(),
-    }
-    
-    return render(request, 'website/virtual-assistance.html', context)
+    return render(request, 'website/virtual-assistance.html', get_page_bundle('virtual_assistance'))
 
 
+@cache_public_page(stale=HIGH_TRAFFIC_STALE)
 def bpo(request):
     """Business Process Outsourcing (BPO) services page"""
-    from .models import BPOHero, BPOService, BPOBenefit, BPOProcessStep, BPOCTA
-
-    context = {
-        'hero': BPOHero.objects.filter(is_active=True).first(),
-        'services': BPOService.objects.filter(is_active=True).order_by('order'),
-        'benefits': BPOBenefit.objects.filter(is_active=True).order_by('order'),
-        'process_steps': BPOProcessStep.objects.filter(is_active=True).order_by('order'),
-        'cta': BPOCTA.objects.filter(is_active=True).first(),
-    }
-
-    return render(request, 'website/bpo.html', context)
+    return render(request, 'website/bpo.html', get_page_bundle('bpo'))
 
 
+@cache_public_page
 def industries(request):
     """Industries We Serve page"""
     return render(request, 'website/industries.html')
 
 
+@cache_public_page
 def case_studies(request):
     """Case Studies page with dynamic content and filtering"""
     # Get filter parameters from URL
@@ -425,7 +275,7 @@ def case_studies(request):
         case_studies = case_studies.order_by('order')
     
     # Get unique categories for filters
-    categories = CaseStudy.objects.filter(is_active=True).values_list('category', flat=True).distinct().order_by('category')
+    categories = CaseStudy.objects.filter(is_active=True).values_list('category', flat=True).distinct().order_by('category').cached()
     
     context = {
         'case_studies': case_studies,
@@ -436,6 +286,7 @@ def case_studies(request):
     return render(request, 'website/case-studies.html', context)
 
 
+@cache_public_page
 def case_study_detail(request, slug):
     """Individual case study detail page"""
     case_study = CaseStudy.objects.filter(slug=slug, is_active=True).first()
@@ -452,7 +303,7 @@ def case_study_detail(request, slug):
     
     # Get CTA content
     from .models import CaseStudiesPageCTA
-    cta = CaseStudiesPageCTA.objects.filter(is_active=True).first()
+    cta = get_singleton(CaseStudiesPageCTA, is_active=True)
     
     context = {
         'case_study': case_study,
@@ -462,6 +313,7 @@ def case_study_detail(request, slug):
     return render(request, 'website/case-study-detail.html', context)
 
 
+@cache_public_page
 def blog(request):
     """Blog/Insights page"""
     from .models import BlogCategory, BlogPost
@@ -506,6 +358,7 @@ def blog(request):
     return render(request, 'website/blog.html', context)
 
 
+@cache_public_page
 def all_blogs(request):
     """All blogs page - shows all published blog posts"""
     from .models import BlogCategory, BlogPost
@@ -546,6 +399,7 @@ def all_blogs(request):
     return render(request, 'website/blog.html', context)
 
 
+@cache_public_page
 def blog_detail(request, slug):
     """Individual blog post detail page"""
     from .models import BlogPost, BlogCategory
@@ -574,6 +428,7 @@ def blog_detail(request, slug):
     return render(request, 'website/blog_detail.html', context)
 
 
+@cache_public_page
 def careers(request):
     """Careers page with dynamic content and application form handling"""
     from .models import (CareersHero, CareersStat, JobDepartment, JobLocation,
@@ -603,6 +458,8 @@ def careers(request):
             application.save()
             messages.success(request, 'Your application has been submitted successfully! We will get back to you soon.')
             return redirect('careers')
+        except DatabaseError:
+            raise  # DatabaseUnavailableMiddleware: "try again in a minute"
         except Exception as e:
             messages.error(request, 'There was an error submitting your application. Please try again.')
     
@@ -616,12 +473,12 @@ def careers(request):
             pass
     
     context = {
-        'hero': CareersHero.objects.filter(is_active=True).first(),
+        'hero': get_singleton(CareersHero, is_active=True),
         'stats': CareersStat.objects.filter(is_active=True).order_by('order'),
         'departments': JobDepartment.objects.filter(is_active=True).order_by('order'),
         'locations': JobLocation.objects.filter(is_active=True).order_by('order'),
         'job_openings': JobOpening.objects.filter(is_active=True).select_related('department', 'location').order_by('order'),
-        'talent_management': TalentManagement.objects.filter(is_active=True).first(),
+        'talent_management': get_singleton(TalentManagement, is_active=True),
         'talent_features': TalentFeature.objects.filter(is_active=True).order_by('order'),
         'selected_job': selected_job,
     }
@@ -629,6 +486,7 @@ def careers(request):
     return render(request, 'website/careers.html', context)
 
 
+@cache_public_page
 def testimonials(request):
     """Testimonials page showcasing client reviews from all services"""
     from .models import (
@@ -639,11 +497,11 @@ def testimonials(request):
     )
     
     # Get dynamic page content
-    seo = TestimonialsPageSEO.objects.first()
-    hero = TestimonialsPageHero.objects.filter(is_active=True).first()
-    why_choose = TestimonialsPageWhyChoose.objects.filter(is_active=True).first()
+    seo = get_singleton(TestimonialsPageSEO)
+    hero = get_singleton(TestimonialsPageHero, is_active=True)
+    why_choose = get_singleton(TestimonialsPageWhyChoose, is_active=True)
     why_choose_reasons = TestimonialsPageWhyChooseReason.objects.filter(is_active=True).order_by('order')
-    cta = TestimonialsPageCTA.objects.filter(is_active=True).first()
+    cta = get_singleton(TestimonialsPageCTA, is_active=True)
     metrics = TestimonialsPageMetric.objects.filter(is_active=True).order_by('order')
     
     # Gather testimonials from all services
@@ -735,64 +593,7 @@ def testimonials(request):
     return render(request, 'website/testimonials.html', context)
 
 
-def get_country_from_ip(ip_address):
-    """Get country name from IP address using free API"""
-    if not ip_address:
-        return 'Unknown'
-    
-    # Check for local/private IPs
-    if ip_address == '127.0.0.1' or ip_address == '::1' or ip_address.startswith('192.168.') or ip_address.startswith('10.') or ip_address.startswith('172.16.'):
-        return 'Local/Unknown'
-    
-    # Try multiple APIs to get country
-    try:
-        # Method 1: ip-api.com (free, no API key required, 45 requests/minute)
-        response = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'success':
-                country = data.get('country', '').strip()
-                if country and country != 'None':
-                    return country
-    except Exception as e:
-        pass
-    
-    try:
-        # Method 2: ipapi.co (free, 1000 requests/day)
-        response = requests.get(f'https://ipapi.co/{ip_address}/country_name/', timeout=5)
-        if response.status_code == 200:
-            country = response.text.strip()
-            if country and country != 'None' and country != 'Undefined':
-                return country
-    except Exception as e:
-        pass
-    
-    try:
-        # Method 3: ip-api.com alternative endpoint
-        response = requests.get(f'https://ip-api.com/json/{ip_address}?fields=status,country', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'success':
-                country = data.get('country', '').strip()
-                if country and country != 'None':
-                    return country
-    except Exception as e:
-        pass
-    
-    try:
-        # Method 4: ipgeolocation.io (free tier available)
-        response = requests.get(f'https://api.ipgeolocation.io/ipgeo?ip={ip_address}', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            country = data.get('country_name', '').strip()
-            if country and country != 'None':
-                return country
-    except Exception as e:
-        pass
-    
-    # If all APIs fail, return Unknown
-    return 'Unknown'
-
+@cache_public_page
 def contact(request):
     """Contact page with form handling and tracking"""
     if request.method == 'POST':
@@ -823,8 +624,8 @@ def contact(request):
             else:
                 ip_address = request.META.get('REMOTE_ADDR')
             
-            # Get country from IP address
-            country = get_country_from_ip(ip_address) if ip_address else 'Unknown'
+            # Country is looked up in the background once the inquiry is saved (website/geolocation.py)
+            country = COUNTRY_PENDING if ip_address else UNKNOWN_COUNTRY
             
             # Sanitize URLs (limit length)
             source_url = request.POST.get('source_url', request.build_absolute_uri())[:500]
@@ -851,8 +652,12 @@ def contact(request):
                 utm_campaign=request.POST.get('utm_campaign', '').strip()[:100],
             )
             inquiry.save()
+            if ip_address:
+                schedule_country_lookup(inquiry)
             messages.success(request, 'Thank you! Your inquiry has been submitted successfully. We will get back to you within 24 hours.')
             return redirect('contact')
+        except DatabaseError:
+            raise  # DatabaseUnavailableMiddleware: "try again in a minute"
         except Exception as e:
             # Don't expose error details to users (security best practice)
             messages.error(request, 'An error occurred. Please try again.')
@@ -862,14 +667,10 @@ def contact(request):
                 print(f"Contact form error: {str(e)}")
                 traceback.print_exc()
     
-    # Get current URL and UTM parameters for form
+    # Source URL / UTM fields are filled client-side (contact.html) so the page is cacheable
+    # and ad-click variants of the URL share one cached copy.
     context = {
-        'current_url': request.build_absolute_uri(),
-        'utm_source': request.GET.get('utm_source', ''),
-        'utm_medium': request.GET.get('utm_medium', ''),
-        'utm_campaign': request.GET.get('utm_campaign', ''),
-        'referrer': request.META.get('HTTP_REFERER', ''),
-        'contact_page': ContactPage.objects.first(),
+        'contact_page': get_singleton(ContactPage),
         'contact_features': ContactPageFeature.objects.all().order_by('order'),
         'contact_faqs': ContactPageFAQ.objects.all().order_by('order'),
     }
@@ -907,6 +708,8 @@ def newsletter_subscribe(request):
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({'success': True, 'message': 'Successfully subscribed to our newsletter! Thank you!'})
                 messages.success(request, 'Successfully subscribed to our newsletter! Thank you!')
+        except DatabaseError:
+            raise  # DatabaseUnavailableMiddleware: "try again in a minute"
         except Exception as e:
             # Don't expose error details
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -920,6 +723,13 @@ def newsletter_subscribe(request):
     return redirect(referer)
 
 
+@require_GET
+@never_cache
+def csrf_token(request):
+    """CSRF token for pre-rendered pages, whose forms are published without one (see base.html)."""
+    return JsonResponse({'csrfToken': get_token(request)})
+
+
 @require_POST
 def chatbot_query(request):
     """Handle chatbot queries using Gemini API with security measures (CSRF required)."""
@@ -0,0 +1,78 @@
+"""
+Warm-up after a deploy or a worker (re)start.
+
+- warm_worker(): per-process state — compiles the site templates into the cached template loader
+  and builds the chatbot context. Called from gunicorn's post_worker_init hook, so recycled
+  workers (max_requests) start warm too.
+- fetch_paths(): shared state — requests URLs from gunicorn over the local socket, which fills the
+  page cache and page bundles for every worker (used by manage.py warm_cache).
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+
+from .chatbot_context import get_chatbot_context
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Load every project template once (the cached loader keeps them compiled); returns a count."""
+    count = 0
+    for template_dir in settings.TEMPLATES[0]['DIRS']:
+        template_dir = Path(template_dir)
+        for path in sorted(template_dir.rglob('*.html')):
+            name = path.relative_to(template_dir).as_posix()
+            try:
+                get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.warning("Warm-up: could not compile %s", name, exc_info=True)
+                continue
+            count += 1
+    return count
+
+
+def warm_worker():
+    started = time.monotonic()
+    count = compile_templates()
+    get_chatbot_context()
+    logger.info("Warm-up: %d templates + chatbot context in %.2fs", count, time.monotonic() - started)
+
+
+def _fetch(base_url, host, path, timeout):
+    started = time.monotonic()
+    try:
+        response = requests.get(
+            base_url + path,
+            headers={
+                'Host': host,
+                # Behind nginx in production: without it SECURE_SSL_REDIRECT answers 301.
+                'X-Forwarded-Proto': 'https',
+                'Accept-Encoding': 'br, gzip',
+            },
+            timeout=timeout,
+            allow_redirects=False,
+        )
+    except requests.RequestException as exc:
+        return path, None, time.monotonic() - started, str(exc)
+    return path, response.status_code, time.monotonic() - started, response.headers.get('X-Page-Cache', '')
+
+
+def fetch_paths(paths, base_url, host, concurrency=8, timeout=30):
+    """
+    GET each path from base_url concurrently.
+
+    Returns [(path, status or None on a connection error, seconds, X-Page-Cache or error text)]
+    in the order given.
+    """
+    base_url = base_url.rstrip('/')
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_fetch, base_url, host, path, timeout) for path in paths]
+        return [future.result() for future in futures]